@@ -0,0 +1,823 @@
+__all__ = [
+    "MediaPlaceholders",
+    "savePresentation",
+    "writePackage",
+    "deflateData",
+    "writeDeflatedMember",
+    "writeRawMember",
+    "copyRawMember",
+    "compactPackage",
+    "linkMovie",
+    "finalizePresentation",
+    "mergePresentations",
+    "DeckEditor",
+]
+
+import io
+import os
+import re
+import sys
+import time
+import struct
+import argparse
+import pathlib
+import posixpath
+import mimetypes
+import urllib.parse
+import urllib.request
+import zlib
+import uuid
+import shutil
+import hashlib
+import zipfile
+import itertools
+import concurrent.futures
+import pptx
+import pptx.shapes.picture
+import lxml.etree as etree
+from pptx.oxml.ns import qn
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+# noinspection PyProtectedMember
+etreeElementClass = etree._Element
+
+# Media added through MediaPlaceholders starts with this marker, followed by a hash of the path of its file
+placeholder_marker = b"presentations-media-placeholder:"
+placeholder_length = len(placeholder_marker) + 64
+# Size of the chunks media files are copied into the package in
+copy_chunk_size = 1024 * 1024
+# Parts in these formats are already compressed, so deflating them again costs time without making them smaller
+compressed_extensions = {".mp4", ".m4v", ".mov", ".wmv", ".avi", ".mp3", ".m4a", ".wav", ".png", ".jpg", ".jpeg",
+                         ".gif", ".tif", ".tiff"}
+# Namespaces of the package parts edited without python-pptx
+relationships_namespace = "http://schemas.openxmlformats.org/package/2006/relationships"
+content_types_namespace = "http://schemas.openxmlformats.org/package/2006/content-types"
+p14_namespace = "http://schemas.microsoft.com/office/powerpoint/2010/main"
+# Extension of presentation.xml that holds the sections of a presentation
+section_list_uri = "{521415D9-36F7-43E2-AB2F-B90AF26B5E84}"
+root_rels_name = "_rels/.rels"
+content_types_name = "[Content_Types].xml"
+presentation_name = "ppt/presentation.xml"
+# Parts that belong to a single slide, and are copied with it between packages (the others, like layouts and masters,
+# are shared by all slides)
+slide_part_folders = ("ppt/slides/", "ppt/notesSlides/", "ppt/media/")
+numbered_part_pattern = re.compile(r'^(.*?)(\d+)(\.\w+)$')
+# Size of the fixed fields of a zip local file header
+local_header_size = 30
+media_part_pattern = re.compile(r'ppt/media/media(\d+)\.')
+
+
+class MediaPlaceholders:
+    """
+    Small stand-ins for media files, added to a presentation instead of the files themselves.
+
+    python-pptx holds every media part in memory (when adding it and again when saving the package), so decks with a
+    lot of video can take several gigabytes of memory.  The stand-ins are swapped for their files by savePresentation,
+    which copies them into the package straight from the disk.
+    """
+
+    def __init__(self):
+        self.files = dict()
+        pass
+
+    def placeholder(self, filename: str) -> io.BytesIO:
+        """Return the stand-in for filename, which can be given to python-pptx in place of the file."""
+        path = os.path.abspath(filename)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Media file {filename!r} does not exist.")
+        token = placeholder_marker + hashlib.sha256(path.encode()).hexdigest().encode()
+        self.files[token] = path
+        return io.BytesIO(token)
+
+    def __getitem__(self, token: bytes) -> str:
+        return self.files[token]
+
+    def __contains__(self, token: bytes) -> bool:
+        return token in self.files
+
+    pass
+
+
+def savePresentation(prs: pptx.Presentation, filename: str, placeholders: MediaPlaceholders,
+                     compress_workers: int = 0) -> dict:
+    """
+    Save prs to filename, copying the media files of its placeholders into the package in chunks.
+
+    Only the XML parts (and small images) are ever held in memory, no matter how much media the presentation holds.
+    Returns how long each phase of saving took (in seconds) and how many bytes of media were copied.
+    """
+    start = time.perf_counter()
+    # The package without any media is small enough to build in memory
+    package = io.BytesIO()
+    prs.save(package)
+    package.seek(0)
+    package_time = time.perf_counter() - start
+    with zipfile.ZipFile(package) as source:
+        parts = [(info, source.read(info)) for info in source.infolist()]
+        pass
+    media = {info.filename: placeholders[data] for info, data in parts
+             if info.file_size == placeholder_length and data in placeholders}
+    timings = writePackage(filename, parts, media, compress_workers)
+    timings["package"] = package_time
+    return timings
+
+
+def writePackage(filename: str, parts: list, media: dict, compress_workers: int = 0) -> dict:
+    """
+    Write the (ZipInfo, data) parts of a package to filename, with the parts named in media copied from their files.
+
+    Media is stored as it is, and the other parts are deflated, on compress_workers threads when it isn't 0.
+    Returns how long each phase of writing took (in seconds) and how many bytes of media were copied.
+    """
+    timings = {"compress": 0.0, "parts": 0.0, "media": 0.0, "media_bytes": 0}
+    deflated = [info.filename not in media and
+                os.path.splitext(info.filename)[1].lower() not in compressed_extensions for info, data in parts]
+
+    start = time.perf_counter()
+    to_deflate = [data for (info, data), deflate in zip(parts, deflated) if deflate]
+    if compress_workers:
+        # zlib releases the GIL while compressing, so the parts are deflated at the same time
+        with concurrent.futures.ThreadPoolExecutor(compress_workers) as pool:
+            compressed = iter(list(pool.map(deflateData, to_deflate)))
+            pass
+        pass
+    else:
+        compressed = iter(list(map(deflateData, to_deflate)))
+        pass
+    timings["compress"] = time.perf_counter() - start
+
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_STORED) as target:
+        for (info, data), deflate in zip(parts, deflated):
+            start = time.perf_counter()
+            member = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            member.external_attr = info.external_attr
+            if deflate:
+                writeDeflatedMember(target, member, *next(compressed))
+                timings["parts"] += time.perf_counter() - start
+                pass
+            elif info.filename in media:
+                # Media files can be larger than 4 GiB, which needs zip64 records before the size is known
+                with open(media[info.filename], "rb") as media_file, \
+                        target.open(member, "w", force_zip64=True) as part:
+                    shutil.copyfileobj(media_file, part, copy_chunk_size)
+                    pass
+                timings["media"] += time.perf_counter() - start
+                timings["media_bytes"] += member.file_size
+                pass
+            else:
+                target.writestr(member, data)
+                timings["parts"] += time.perf_counter() - start
+                pass
+            pass
+        pass
+    return timings
+
+
+def deflateData(data: bytes, level: int = zlib.Z_DEFAULT_COMPRESSION) -> tuple:
+    """Return the CRC, size, and raw deflate stream (as zip files hold it) of data."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return zlib.crc32(data), len(data), compressor.compress(data) + compressor.flush()
+
+
+def writeDeflatedMember(archive: zipfile.ZipFile, info: zipfile.ZipInfo, crc: int, size: int, compressed: bytes):
+    """
+    Write a member that was already deflated (see deflateData) to archive, which must be open for writing.
+
+    zipfile can only write members it compresses itself, so this writes the local header and data the same way
+    ZipFile.open does, and records the member for the central directory.
+    """
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.CRC = crc
+    info.file_size = size
+    info.compress_size = len(compressed)
+    writeRawMember(archive, info, [compressed])
+    pass
+
+
+def writeRawMember(archive: zipfile.ZipFile, info: zipfile.ZipInfo, chunks):
+    """
+    Write a member whose data is already in its final (compressed) form to archive, which must be open for writing.
+
+    info must already hold the compression, CRC, and sizes of the member, and chunks is an iterable of its data.
+    """
+    # Sizes are in the local header, so no data descriptor follows the data, and zipfile adds any zip64 extra itself
+    info.flag_bits &= ~0x08
+    info.extra = b""
+    # noinspection PyProtectedMember
+    with archive._lock:
+        archive.fp.seek(archive.start_dir)
+        info.header_offset = archive.fp.tell()
+        archive.fp.write(info.FileHeader())
+        for chunk in chunks:
+            archive.fp.write(chunk)
+            pass
+        archive.start_dir = archive.fp.tell()
+        archive.filelist.append(info)
+        archive.NameToInfo[info.filename] = info
+        archive._didModify = True
+        pass
+    pass
+
+
+def readRawMember(file, info: zipfile.ZipInfo):
+    """Yield the data of a member of the zip file open as file, as it is stored (i.e. without decompressing it)."""
+    file.seek(info.header_offset)
+    header = file.read(local_header_size)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    file.seek(info.header_offset + local_header_size + name_length + extra_length)
+    remaining = info.compress_size
+    while remaining:
+        chunk = file.read(min(remaining, copy_chunk_size))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Member {info.filename!r} is truncated.")
+        remaining -= len(chunk)
+        yield chunk
+    pass
+
+
+def compactPackage(filename: str):
+    """
+    Rewrite filename without the space left by replaced or removed members (see DeckEditor).
+
+    Members are copied as they are stored, so nothing is decompressed or compressed again.
+    """
+    partial_filename = filename + ".partial"
+    with open(filename, "rb") as file, zipfile.ZipFile(filename) as source, \
+            zipfile.ZipFile(partial_filename, "w") as target:
+        for info in source.infolist():
+            copyRawMember(target, file, info)
+            pass
+        pass
+    os.replace(partial_filename, filename)
+    pass
+
+
+def copyRawMember(archive: zipfile.ZipFile, file, info: zipfile.ZipInfo, name: str = None,
+                  date_time: tuple = None):
+    """Copy the member info of the zip file open as file to archive (as name), without decompressing it."""
+    member = zipfile.ZipInfo(name or info.filename, date_time=date_time or info.date_time)
+    member.external_attr = info.external_attr
+    member.compress_type = info.compress_type
+    member.CRC = info.CRC
+    member.file_size = info.file_size
+    member.compress_size = info.compress_size
+    member.flag_bits = info.flag_bits
+    writeRawMember(archive, member, readRawMember(file, info))
+    pass
+
+
+def linkMovie(movie: pptx.shapes.picture.Movie, filename: str):
+    """
+    Make movie play filename from where it is on the disk, instead of a copy embedded in the presentation.
+
+    Decks with linked movies save almost instantly, but only play on a computer that has the files at the same place
+    (see finalizePresentation to embed them).
+    """
+    uri = pathlib.Path(filename).resolve().as_uri()
+    slide_part = movie.part
+    video_file = movie.element.find(".//" + qn("a:videoFile"))
+    media = movie.element.find(".//{%s}media" % p14_namespace)
+    embedded_rIds = {video_file.get(qn("r:link")), media.get(qn("r:embed"))}
+    video_file.set(qn("r:link"), slide_part.relate_to(uri, RT.VIDEO, is_external=True))
+    del media.attrib[qn("r:embed")]
+    media.set(qn("r:link"), slide_part.relate_to(uri, RT.MEDIA, is_external=True))
+    # Without any references left, the embedded media part isn't written to the package
+    for rId in embedded_rIds:
+        slide_part.drop_rel(rId)
+        pass
+    pass
+
+
+def finalizePresentation(filename: str, output: str = None, compress_workers: int = 0) -> int:
+    """
+    Embed the movies linked by linkMovie into the presentation, so it can be shared on its own.
+
+    The presentation is rewritten at the zip level, so the media is copied from the disk in chunks and never held in
+    memory.  Returns the number of media files embedded.
+    """
+    output = filename if output is None else output
+    with zipfile.ZipFile(filename) as source:
+        parts = [(info, source.read(info)) for info in source.infolist()]
+        pass
+    part_data = {info.filename: data for info, data in parts}
+    media_numbers = [int(match.group(1)) for match in map(media_part_pattern.match, part_data) if match]
+    next_media_number = max(media_numbers, default=0) + 1
+
+    # file uri -> name of the part its media is embedded as
+    media_parts = dict()
+    new_parts = list()
+    for info, data in parts:
+        if not info.filename.endswith(".rels"):
+            continue
+        rels = etree.fromstring(data)
+        # rIds of the media relationships that are now internal, and have to be referenced with r:embed
+        embedded_rIds = set()
+        for rel in rels.iter("{%s}Relationship" % relationships_namespace):
+            if rel.get("TargetMode") != "External" or rel.get("Type") not in (RT.VIDEO, RT.MEDIA) or \
+                    not rel.get("Target").startswith("file:"):
+                continue
+            uri = rel.get("Target")
+            if uri not in media_parts:
+                media_file = urllib.request.url2pathname(urllib.parse.urlparse(uri).path)
+                if not os.path.isfile(media_file):
+                    raise FileNotFoundError(f"Linked media file {media_file!r} (used by {info.filename}) does not "
+                                            f"exist.")
+                media_parts[uri] = f"ppt/media/media{next_media_number}{os.path.splitext(media_file)[1].lower()}"
+                next_media_number += 1
+                new_parts.append((zipfile.ZipInfo(media_parts[uri], date_time=info.date_time), None, media_file))
+                pass
+            # rels files are in a "_rels" folder next to the part they belong to
+            source_folder = posixpath.dirname(posixpath.dirname(info.filename))
+            rel.set("Target", posixpath.relpath(media_parts[uri], source_folder))
+            del rel.attrib["TargetMode"]
+            if rel.get("Type") == RT.MEDIA:
+                embedded_rIds.add(rel.get("Id"))
+                pass
+            pass
+        if not embedded_rIds:
+            continue
+        part_data[info.filename] = etree.tostring(rels, xml_declaration=True, encoding="UTF-8", standalone=True)
+        source_name = posixpath.join(posixpath.dirname(posixpath.dirname(info.filename)),
+                                     posixpath.basename(info.filename)[:-len(".rels")])
+        source_part = etree.fromstring(part_data[source_name])
+        for media in source_part.iter("{%s}media" % p14_namespace):
+            if media.get(qn("r:link")) in embedded_rIds:
+                media.set(qn("r:embed"), media.attrib.pop(qn("r:link")))
+                pass
+            pass
+        part_data[source_name] = etree.tostring(source_part, xml_declaration=True, encoding="UTF-8", standalone=True)
+        pass
+
+    # Make sure the content types of the new media parts are declared
+    content_types = etree.fromstring(part_data["[Content_Types].xml"])
+    declared = {default.get("Extension").lower() for default in content_types.iter("{%s}Default" %
+                                                                                   content_types_namespace)}
+    for media_info, _, media_file in new_parts:
+        extension = posixpath.splitext(media_info.filename)[1].lstrip(".")
+        if extension not in declared:
+            content_type = mimetypes.guess_type(media_file)[0] or "video/unknown"
+            content_types.insert(0, etree.Element("{%s}Default" % content_types_namespace, Extension=extension,
+                                                  ContentType=content_type))
+            declared.add(extension)
+            pass
+        pass
+    part_data["[Content_Types].xml"] = etree.tostring(content_types, xml_declaration=True, encoding="UTF-8",
+                                                      standalone=True)
+
+    parts = [(info, part_data[info.filename]) for info, _ in parts] + [(info, data) for info, data, _ in new_parts]
+    media = {info.filename: media_file for info, _, media_file in new_parts}
+    # Write next to the output first, so the presentation isn't lost if embedding fails (or output is filename)
+    partial_output = output + ".partial"
+    writePackage(partial_output, parts, media, compress_workers)
+    os.replace(partial_output, output)
+    return len(new_parts)
+
+
+def mergePresentations(filename: str, sections: list) -> int:
+    """
+    Write the presentation filename with the slides of the presentations in sections, a list of (section name,
+    presentation), in order and with a section for each.
+
+    The first presentation is copied as it is (its slide size, layouts, and masters are used for all the slides), and
+    the slides of the others are copied into it with their notes and media, which are copied as they are stored.
+    Returns the number of slides.
+    """
+    partial_filename = filename + ".partial"
+    shutil.copyfile(sections[0][1], partial_filename)
+    try:
+        with DeckEditor(partial_filename) as deck:
+            section_parts = [[slide_part for slide_part, _ in deck.slides()]]
+            for _, presentation in sections[1:]:
+                with zipfile.ZipFile(presentation) as source:
+                    section_parts.append(deck.insertSlides(source))
+                    pass
+                pass
+            deck.setSlides([slide_part for slide_parts in section_parts for slide_part in slide_parts])
+            deck.setSections([(name, slide_parts) for (name, _), slide_parts in zip(sections, section_parts)])
+            pass
+        pass
+    except BaseException:
+        os.remove(partial_filename)
+        raise
+    os.replace(partial_filename, filename)
+    return sum(map(len, section_parts))
+
+
+class DeckEditor:
+    """
+    Edits a presentation in place at the zip level, without loading it with python-pptx.
+
+    Edited and new parts are appended to the zip file when the editor is closed, and the members they replace are only
+    dropped from its central directory, so the time taken depends on what changed, not the size of the presentation.
+    The dead space is compacted away once it's a large part of the file (see compactPackage).
+    """
+
+    # The file is compacted when more than this fraction of it is dead space
+    compact_fraction = 0.5
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.archive = zipfile.ZipFile(filename, "a")
+        # parts that are written on close: name -> bytes, parsed xml, or the file the part is copied from
+        self.data = dict()
+        self.xml = dict()
+        self.media = dict()
+        # parts copied (as they are stored) from other packages: name -> (package file, member)
+        self.copies = dict()
+        self.removed = set()
+        self.__partNumbers__ = dict()
+        pass
+
+    def __enter__(self) -> "DeckEditor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+            pass
+        else:
+            # Nothing is written until close, so the presentation is left as it was
+            self.archive.close()
+            pass
+        pass
+
+    def names(self) -> set:
+        """Return the names of all parts in the package, as it will be written."""
+        return (set(self.archive.NameToInfo) | set(self.data) | set(self.xml) | set(self.media) |
+                set(self.copies)) - self.removed
+
+    def read(self, name: str) -> bytes:
+        if name in self.removed:
+            raise KeyError(f"Part {name!r} was removed.")
+        if name in self.xml:
+            return etree.tostring(self.xml[name], xml_declaration=True, encoding="UTF-8", standalone=True)
+        if name in self.data:
+            return self.data[name]
+        if name in self.copies:
+            with zipfile.ZipFile(self.copies[name][0]) as source:
+                return source.read(self.copies[name][1])
+        return self.archive.read(name)
+
+    def readXml(self, name: str) -> etreeElementClass:
+        """Return the parsed xml of a part, where changes are written back to the package on close."""
+        if name not in self.xml:
+            self.xml[name] = etree.fromstring(self.read(name))
+            self.data.pop(name, None)
+            self.copies.pop(name, None)
+            pass
+        return self.xml[name]
+
+    def write(self, name: str, data: bytes):
+        self.removed.discard(name)
+        self.xml.pop(name, None)
+        self.media.pop(name, None)
+        self.copies.pop(name, None)
+        self.data[name] = data
+        pass
+
+    def writeMedia(self, name: str, filename: str):
+        self.removed.discard(name)
+        self.xml.pop(name, None)
+        self.data.pop(name, None)
+        self.copies.pop(name, None)
+        self.media[name] = filename
+        pass
+
+    def copyMember(self, name: str, filename: str, info: zipfile.ZipInfo):
+        """Write the member info of the package filename as the part name, copying it as it's stored on close."""
+        self.removed.discard(name)
+        self.xml.pop(name, None)
+        self.data.pop(name, None)
+        self.media.pop(name, None)
+        self.copies[name] = (filename, info)
+        pass
+
+    def remove(self, name: str):
+        self.xml.pop(name, None)
+        self.data.pop(name, None)
+        self.media.pop(name, None)
+        self.copies.pop(name, None)
+        self.removed.add(name)
+        pass
+
+    def rels(self, name: str) -> list:
+        """Return the (rId, type, part name) of the internal relationships of a part (use "" for the package)."""
+        rels_name = relsPartName(name)
+        if rels_name not in self.names():
+            return list()
+        return [(rel.get("Id"), rel.get("Type"), resolveTarget(name, rel.get("Target")))
+                for rel in etree.fromstring(self.read(rels_name)).iter("{%s}Relationship" % relationships_namespace)
+                if rel.get("TargetMode") != "External"]
+
+    def slides(self) -> list:
+        """Return the (part name, name) of each slide, in the order of the presentation."""
+        slide_parts = {rId: target for rId, _, target in self.rels(presentation_name)}
+        slides = list()
+        for sldId in etree.fromstring(self.read(presentation_name)).iter(qn("p:sldId")):
+            slide_name = slide_parts[sldId.get(qn("r:id"))]
+            cSld = etree.fromstring(self.read(slide_name)).find(qn("p:cSld"))
+            slides.append((slide_name, cSld.get("name", "")))
+            pass
+        return slides
+
+    def setSlideName(self, slide_part: str, name: str):
+        self.readXml(slide_part).find(qn("p:cSld")).set("name", name)
+        pass
+
+    def setNotes(self, slide_part: str, notes: str):
+        """Replace the text of the notes of a slide, with a paragraph for each line (like python-pptx does)."""
+        notes_parts = [target for _, reltype, target in self.rels(slide_part) if reltype == RT.NOTES_SLIDE]
+        if not notes_parts:
+            raise ValueError(f"Slide {slide_part!r} doesn't have a notes slide.")
+        notes_slide = self.readXml(notes_parts[0])
+        bodies = [shape for shape in notes_slide.iter(qn("p:sp"))
+                  if shape.find("%s/%s/%s" % (qn("p:nvSpPr"), qn("p:nvPr"), qn("p:ph"))) is not None and
+                  shape.find("%s/%s/%s" % (qn("p:nvSpPr"), qn("p:nvPr"), qn("p:ph"))).get("type") == "body"]
+        if not bodies or bodies[0].find(qn("p:txBody")) is None:
+            raise ValueError(f"The notes slide of {slide_part!r} doesn't have a notes placeholder.")
+        txBody = bodies[0].find(qn("p:txBody"))
+        for paragraph in txBody.findall(qn("a:p")):
+            txBody.remove(paragraph)
+            pass
+        for line in notes.split("\n"):
+            paragraph = etree.SubElement(txBody, qn("a:p"))
+            if line:
+                etree.SubElement(etree.SubElement(paragraph, qn("a:r")), qn("a:t")).text = line
+                pass
+            pass
+        pass
+
+    def setSlideSize(self, width: int, height: int):
+        sldSz = self.readXml(presentation_name).find(qn("p:sldSz"))
+        if (sldSz.get("cx"), sldSz.get("cy")) != (str(width), str(height)):
+            sldSz.set("cx", str(width))
+            sldSz.set("cy", str(height))
+            pass
+        pass
+
+    def insertSlides(self, scratch: zipfile.ZipFile, placeholders: MediaPlaceholders = None) -> list:
+        """
+        Copy the slides of the package scratch (with their notes and media) into this package.
+
+        The copies are not part of the presentation until they are put in it with setSlides.  Placeholder media in
+        scratch is copied from its file, and the other media is copied as it's stored when scratch is a file.  Returns
+        the part names of the copies, in the order of the slides in scratch.
+        """
+        scratch_presentation = etree.fromstring(scratch.read(presentation_name))
+        scratch_rels = etree.fromstring(scratch.read(relsPartName(presentation_name)))
+        slide_parts = {rel.get("Id"): resolveTarget(presentation_name, rel.get("Target"))
+                       for rel in scratch_rels.iter("{%s}Relationship" % relationships_namespace)}
+        scratch_content_types = etree.fromstring(scratch.read(content_types_name))
+        content_types = self.readXml(content_types_name)
+        overrides = {override.get("PartName"): override.get("ContentType")
+                     for override in scratch_content_types.iter("{%s}Override" % content_types_namespace)}
+        defaults = {default.get("Extension").lower(): default
+                    for default in content_types.iter("{%s}Default" % content_types_namespace)}
+        scratch_names = set(scratch.namelist())
+        # scratch part name -> part name in this package
+        renamed = dict()
+
+        def copyPart(name: str) -> str:
+            if name in renamed:
+                return renamed[name]
+            if not name.startswith(slide_part_folders):
+                # Layouts, masters, and such are shared, and the presentations come from the same template
+                if name not in self.names():
+                    raise ValueError(f"Part {name!r} used by the new slides isn't in {self.filename}.")
+                return name
+            new_name = renamed[name] = self.__newPartName__(name)
+            info = scratch.getinfo(name)
+            if placeholders is not None and info.file_size == placeholder_length and \
+                    scratch.read(name) in placeholders:
+                self.writeMedia(new_name, placeholders[scratch.read(name)])
+                pass
+            elif isinstance(scratch.filename, str) and name.startswith("ppt/media/"):
+                # Copied without decompressing (and compressing again) what may be large videos
+                self.copyMember(new_name, scratch.filename, info)
+                pass
+            else:
+                self.write(new_name, scratch.read(name))
+                pass
+
+            rels_name = relsPartName(name)
+            if rels_name in scratch_names:
+                rels = etree.fromstring(scratch.read(rels_name))
+                for rel in rels.iter("{%s}Relationship" % relationships_namespace):
+                    if rel.get("TargetMode") != "External":
+                        target = copyPart(resolveTarget(name, rel.get("Target")))
+                        rel.set("Target", relativeTarget(new_name, target))
+                        pass
+                    pass
+                self.write(relsPartName(new_name), etree.tostring(rels, xml_declaration=True, encoding="UTF-8",
+                                                                  standalone=True))
+                pass
+
+            if "/" + name in overrides:
+                content_types.append(etree.Element("{%s}Override" % content_types_namespace, PartName="/" + new_name,
+                                                   ContentType=overrides["/" + name]))
+                pass
+            else:
+                extension = posixpath.splitext(name)[1].lstrip(".").lower()
+                if extension not in defaults:
+                    default = next(default for default in scratch_content_types.iter(
+                        "{%s}Default" % content_types_namespace) if default.get("Extension").lower() == extension)
+                    defaults[extension] = etree.Element("{%s}Default" % content_types_namespace,
+                                                        Extension=extension, ContentType=default.get("ContentType"))
+                    content_types.insert(0, defaults[extension])
+                    pass
+                pass
+            return new_name
+
+        return [copyPart(slide_parts[sldId.get(qn("r:id"))]) for sldId in scratch_presentation.iter(qn("p:sldId"))]
+
+    def setSlides(self, slide_parts: list):
+        """Make the presentation show the slide parts in order, and remove the parts that are no longer used."""
+        presentation = self.readXml(presentation_name)
+        rels = self.readXml(relsPartName(presentation_name))
+        slide_rels = {resolveTarget(presentation_name, rel.get("Target")): rel
+                      for rel in rels.iter("{%s}Relationship" % relationships_namespace) if rel.get("Type") == RT.SLIDE}
+        rId_numbers = [int(rel.get("Id")[3:]) for rel in rels.iter("{%s}Relationship" % relationships_namespace)
+                       if rel.get("Id", "").startswith("rId") and rel.get("Id")[3:].isdigit()]
+        next_rId = itertools.count(max(rId_numbers, default=0) + 1)
+
+        sldIdLst = presentation.find(qn("p:sldIdLst"))
+        if sldIdLst is None:
+            sldIdLst = etree.Element(qn("p:sldIdLst"))
+            presentation.find(qn("p:sldSz")).addprevious(sldIdLst)
+            pass
+        slide_ids = {sldId.get(qn("r:id")): sldId.get("id") for sldId in sldIdLst}
+        # slide ids start at 256
+        next_id = itertools.count(max(map(int, slide_ids.values()), default=255) + 1)
+        for sldId in list(sldIdLst):
+            sldIdLst.remove(sldId)
+            pass
+        for slide_part in slide_parts:
+            if slide_part not in slide_rels:
+                slide_rels[slide_part] = etree.SubElement(rels, "{%s}Relationship" % relationships_namespace,
+                                                          Id=f"rId{next(next_rId)}", Type=RT.SLIDE,
+                                                          Target=relativeTarget(presentation_name, slide_part))
+                pass
+            rId = slide_rels[slide_part].get("Id")
+            etree.SubElement(sldIdLst, qn("p:sldId"), id=slide_ids.get(rId) or str(next(next_id)),
+                             attrib={qn("r:id"): rId})
+            pass
+        for slide_part, rel in slide_rels.items():
+            if slide_part not in slide_parts:
+                rels.remove(rel)
+                pass
+            pass
+        self.__collectGarbage__()
+        pass
+
+    def setSections(self, sections: list):
+        """
+        Group the slides of the presentation into sections, a list of (section name, slide parts), replacing any
+        sections it had.  The slides must already be in the presentation (see setSlides).
+        """
+        presentation = self.readXml(presentation_name)
+        slide_rIds = {target: rId for rId, reltype, target in self.rels(presentation_name) if reltype == RT.SLIDE}
+        slide_ids = {sldId.get(qn("r:id")): sldId.get("id") for sldId in presentation.iter(qn("p:sldId"))}
+        extLst = presentation.find(qn("p:extLst"))
+        if extLst is None:
+            # extLst is the last element of the presentation
+            extLst = etree.SubElement(presentation, qn("p:extLst"))
+            pass
+        for ext in extLst.findall(qn("p:ext")):
+            if ext.get("uri") == section_list_uri:
+                extLst.remove(ext)
+                pass
+            pass
+        ext = etree.Element(qn("p:ext"), uri=section_list_uri)
+        extLst.insert(0, ext)
+        sectionLst = etree.SubElement(ext, "{%s}sectionLst" % p14_namespace, nsmap={"p14": p14_namespace})
+        for name, slide_parts in sections:
+            # The ids only have to be unique, so they are made from the names to keep them the same between merges
+            section = etree.SubElement(sectionLst, "{%s}section" % p14_namespace, name=name,
+                                       id="{%s}" % str(uuid.uuid5(uuid.NAMESPACE_URL, name)).upper())
+            section_slides = etree.SubElement(section, "{%s}sldIdLst" % p14_namespace)
+            for slide_part in slide_parts:
+                etree.SubElement(section_slides, "{%s}sldId" % p14_namespace, id=slide_ids[slide_rIds[slide_part]])
+                pass
+            pass
+        pass
+
+    def close(self):
+        """Write the changes to the presentation, and compact it when too much of it is dead space."""
+        changed = set(self.data) | set(self.xml) | set(self.media) | set(self.copies)
+        if not changed and not self.removed:
+            self.archive.close()
+            return
+        for name in changed | self.removed:
+            if name in self.archive.NameToInfo:
+                self.archive.filelist.remove(self.archive.NameToInfo.pop(name))
+                pass
+            pass
+        date_time = time.localtime(time.time())[:6]
+        for name in sorted(changed, key=lambda part: part != content_types_name):
+            member = zipfile.ZipInfo(name, date_time=date_time)
+            member.external_attr = 0o600 << 16
+            if name in self.copies:
+                with open(self.copies[name][0], "rb") as source:
+                    copyRawMember(self.archive, source, self.copies[name][1], name, date_time)
+                    pass
+                pass
+            elif name in self.media:
+                with open(self.media[name], "rb") as media_file, \
+                        self.archive.open(member, "w", force_zip64=True) as part:
+                    shutil.copyfileobj(media_file, part, copy_chunk_size)
+                    pass
+                pass
+            elif os.path.splitext(name)[1].lower() in compressed_extensions:
+                self.archive.writestr(member, self.read(name))
+                pass
+            else:
+                writeDeflatedMember(self.archive, member, *deflateData(self.read(name)))
+                pass
+            pass
+        self.archive._didModify = True
+        live_size = sum(local_header_size + len(info.filename.encode()) + len(info.extra) + info.compress_size
+                        for info in self.archive.filelist)
+        dead_size = self.archive.start_dir - live_size
+        self.archive.close()
+        if dead_size > self.compact_fraction * (live_size + dead_size):
+            compactPackage(self.filename)
+            pass
+        pass
+
+    def __newPartName__(self, name: str) -> str:
+        """Return a name like name (e.g. "ppt/slides/slide12.xml") that no part has yet."""
+        match = numbered_part_pattern.match(name)
+        prefix, extension = (match.group(1), match.group(3)) if match else (posixpath.splitext(name)[0], ".bin")
+        if (prefix, extension) not in self.__partNumbers__:
+            numbers = [int(part[len(prefix):-len(extension)]) for part in self.names()
+                       if part.startswith(prefix) and part.endswith(extension) and
+                       part[len(prefix):-len(extension)].isdigit()]
+            self.__partNumbers__[(prefix, extension)] = itertools.count(max(numbers, default=0) + 1)
+            pass
+        return f"{prefix}{next(self.__partNumbers__[(prefix, extension)])}{extension}"
+
+    def __collectGarbage__(self):
+        """Remove the parts that can't be reached from the package relationships anymore."""
+        reachable = {""}
+        to_visit = [""]
+        while to_visit:
+            for _, _, target in self.rels(to_visit.pop()):
+                if target not in reachable:
+                    reachable.add(target)
+                    to_visit.append(target)
+                    pass
+                pass
+            pass
+        unreachable = {name for name in self.names() if not name.endswith(".rels") and name != content_types_name and
+                       name not in reachable}
+        if not unreachable:
+            return
+        for name in unreachable:
+            self.remove(name)
+            if relsPartName(name) in self.names():
+                self.remove(relsPartName(name))
+                pass
+            pass
+        content_types = self.readXml(content_types_name)
+        for override in list(content_types.iter("{%s}Override" % content_types_namespace)):
+            if override.get("PartName").lstrip("/") in unreachable:
+                content_types.remove(override)
+                pass
+            pass
+        pass
+
+    pass
+
+
+def relsPartName(name: str) -> str:
+    """Return the name of the relationships part of a part (use "" for the package)."""
+    return posixpath.join(posixpath.dirname(name), "_rels", posixpath.basename(name) + ".rels")
+
+
+def resolveTarget(name: str, target: str) -> str:
+    """Return the part name of the target of a relationship of the part name."""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(name), target))
+
+
+def relativeTarget(name: str, target: str) -> str:
+    """Return the relationship target of part name pointing at the part target."""
+    return posixpath.relpath(target, posixpath.dirname(name) or ".")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PPTXPackage",
+                                     description="Tools for PowerPoint files written by PPTXScene.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    finalize_parser = subparsers.add_parser("finalize", help="embed the linked media of a draft PowerPoint "
+                                                             "(i.e. one rendered with embed_media=False)")
+    finalize_parser.add_argument("presentation", help="PowerPoint file to finalize")
+    finalize_parser.add_argument("-o", "--output", default=None, help="where to write the finalized PowerPoint "
+                                                                     "(defaults to overwriting the presentation)")
+    finalize_parser.add_argument("-j", "--workers", type=int, default=0, help="threads deflating the XML parts")
+    arguments = parser.parse_args()
+    embedded = finalizePresentation(arguments.presentation, arguments.output, arguments.workers)
+    print(f"Embedded {embedded} media file{'' if embedded == 1 else 's'} into "
+          f"{arguments.output or arguments.presentation}", file=sys.stdout)
+    pass
@@ -6,22 +6,43 @@ if __name__ == '__main__':
     __package__ = "presentations"
     pass
 from .PresentationLogger import logger, PPTX_INFO, PPTX_DEBUG, PPTX_WARNING
+from .PPTXPackage import MediaPlaceholders, savePresentation, linkMovie, DeckEditor
+from .PresentationNotes import processNotes, composeNotes, notesFingerprint
+from .PresentationManifest import BuildManifest
+from .PresentationQueue import processTag
 
+import io
 import re
+import copy
+import json
+import fnmatch
+import time
+import zipfile
 import warnings
 import itertools
+import hashlib
 import os
 import manim
 import pptx
 import pptx.slide
 import subprocess
+import pathlib
+import concurrent.futures
+import struct
+import numpy
+import PIL.Image
 import lxml.etree as etree
 from functools import reduce
-from typing import List
+from manim.utils.iterables import list_update
+from typing import List, Optional
 
 # noinspection PyProtectedMember
 etreeElementClass = etree._Element
 
+# Build settings that change how the PowerPoint is written, but not its slides
+output_settings = ("output_folder", "media_workers", "stream_media", "package_workers", "embed_media",
+                   "incremental_update", "reuse_slides")
+
 # Plan to convert to pptx in a way that can be used with teams:
 #   Each "Slide" will create multiple pptx slides.
 #   As a test, each pptx slide will hold a single animation, and those animations belonging to the same "Slide" will
@@ -55,6 +76,8 @@ etreeElementClass = etree._Element
 #  starts.  This might be jittery though, so only do this if necessary.
 #  -> A better way to do this would be to "appear" the image in the front foreground AFTER the video completes (that
 #     way the image is there when viewing the slide in the deck, but not there when the animation is playing)
+#  -> PPTXScene(poster_frame="last") now uses the end state as the poster frame of each slide, which shows the end
+#     state when viewing the deck, but also before the video starts playing during the presentation.
 ...
 # Possible future issues:
 #   -There may still be issues with having to restart the slide show when presenting from desktop if the number of
@@ -88,10 +111,32 @@ etreeElementClass = etree._Element
 
 url_schema = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
 
-# This is regex for determining when to condense two or more spaces into one
-# (i.e. whenever the spaces are not preceded by a punctuation)
-not_preceded_pattern = re.compile(r'(?<![.!?]) {2,}', re.M)
-line_start_pattern = re.compile(r'^ ', re.M)
+# Partial movie files cached by manim are named "<camera hash>_<animations hash>_<mobjects hash>"
+# (see manim.utils.hashing.get_hash_from_play_call), so their names already identify their content.
+cached_movie_pattern = re.compile(r'\d+_\d+_\d+')
+
+# Poster image formats and their extensions.  WebP isn't included because python-pptx can't embed it.
+poster_extensions = {
+    "png": ".png",
+    "jpeg": ".jpg",
+}
+
+# Part of the fingerprint of every slide in the PowerPoint, bump it when the way slides are written changes so
+# incremental updates replace the slides written the old way
+slide_format_version = 1
+
+
+# Template presentation, parsed once per process (e.g. by the daemon, see PresentationDaemon), see templatePresentation
+template_presentation = None
+
+
+def templatePresentation() -> pptx.Presentation:
+    """A copy of the template presentation (template.pptx), which is only parsed the first time."""
+    global template_presentation
+    if template_presentation is None:
+        template_presentation = pptx.Presentation(pptx=os.path.join(os.path.split(__file__)[0], "template.pptx"))
+        pass
+    return copy.deepcopy(template_presentation)
 
 
 # Quick and dirty implementation, copying most of PPTXScene from manim_pptx
@@ -100,9 +145,102 @@ class PPTXScene(manim.ThreeDScene):
     def __init__(self, *args, **kwargs):
         self.output_folder = kwargs.pop("output_folder", "./pptx/")
         self.temporary_dir = kwargs.pop("temporary_dir", "./temp/")
+        # Combined slide videos and thumbnails are kept here between runs, keyed by their fingerprint
+        self.cache_dir = kwargs.pop("cache_dir", os.path.join(self.temporary_dir, "slide_cache", ""))
+        self.use_slide_cache = kwargs.pop("use_slide_cache", True)
+        # Number of slides whose videos and thumbnails are combined (by ffmpeg) at the same time in the background
+        # while the following slides are rendered.  Use 0 to combine each slide when it ends instead.
+        self.media_workers = kwargs.pop("media_workers", max(1, (os.cpu_count() or 2) // 2))
+        # Frame of each slide shown before its video plays (and when viewing the deck), either "first" or "last"
+        self.poster_frame = kwargs.pop("poster_frame", "first")
+        if self.poster_frame not in ("first", "last"):
+            raise ValueError(f'poster_frame must be "first" or "last", not {self.poster_frame!r}.')
+        # Image format of the posters ("png" or "jpeg"), the quality for lossy formats (1-95),
+        # and the fraction of the slide size the posters are downscaled to
+        self.poster_format = kwargs.pop("poster_format", "png").lower().replace("jpg", "jpeg")
+        if self.poster_format not in poster_extensions:
+            raise ValueError(f'poster_format must be one of {list(poster_extensions)}, not {self.poster_format!r} '
+                             f'(python-pptx can only embed BMP, GIF, JPEG, PNG, TIFF, and WMF images).')
+        self.poster_quality = kwargs.pop("poster_quality", 85)
+        self.poster_scale = kwargs.pop("poster_scale", 1.0)
+        # Slides with nothing moving on them are embedded as a picture instead of a video
+        self.static_slides_as_pictures = kwargs.pop("static_slides_as_pictures", True)
+        # Waits that would only repeat a frame are done by PowerPoint (pausing the video or delaying the next slide)
+        # instead of being rendered and encoded
+        self.native_waits = kwargs.pop("native_waits", False)
+        # Slide videos are copied into the PowerPoint from the disk when it's saved, instead of being held in memory
+        self.stream_media = kwargs.pop("stream_media", True)
+        # Number of threads deflating the XML parts of the PowerPoint when it's saved (0 to deflate them in turn)
+        self.package_workers = kwargs.pop("package_workers", 0)
+        # Draft decks link to the slide videos where they were combined instead of embedding them, which makes saving
+        # almost instant (embed them with "python -m presentations.PPTXPackage finalize <deck>" before sharing)
+        self.embed_media = kwargs.pop("embed_media", True)
+        # Update the existing PowerPoint in place, replacing only the slides that changed, instead of writing all of it
+        self.incremental_update = kwargs.pop("incremental_update", False)
+        # Record every build (slides, files, and stage timings) in "<temporary_dir>/<presentation>.manifest.sqlite"
+        self.use_manifest = kwargs.pop("use_manifest", True)
+        # Save the finished slides after each one ends, so a build that fails can resume where it stopped
+        self.use_checkpoint = kwargs.pop("use_checkpoint", True)
+        # Reuse the slides of the last build (as recorded in the manifest) whose code didn't change and that start from
+        # the same state, fast-forwarding through them, so only the slides that changed (and those that start where
+        # they end) are rendered, e.g. to update the PowerPoint in place after editing a slide (see PresentationWatch)
+        self.reuse_slides = kwargs.pop("reuse_slides", False)
+        # Build only the Slides matching these patterns (e.g. "T02_Philosophy.Circle*", comma separated) and their
+        # child slides into a "<presentation>_preview" deck, fast-forwarding through the slides before them
+        # (defaults to the PRESENTATIONS_SLIDES environment variable, so it can be used with the manim command)
+        self.select_slides = kwargs.pop("select_slides", os.environ.get("PRESENTATIONS_SLIDES") or None)
+        if isinstance(self.select_slides, str):
+            self.select_slides = [pattern.strip() for pattern in self.select_slides.split(",") if pattern.strip()]
+            pass
+        self.select_slides = list(self.select_slides) if self.select_slides else None
         super(PPTXScene, self).__init__(*args, **kwargs)
 
         self.slides = list()
+        self.mediaJobs = list()
+        self.mediaPool = None
+        # Number of frames written for each animation (None when that can't be known until the video is written)
+        self.animationFrames = list()
+        # Whether each animation was a static frame (i.e. a wait without anything updating)
+        self.animationStatic = list()
+        # What was on screen during each frozen wait of the current slide, which its picture has to show (see endSlide)
+        self.slideFrozenStates = list()
+        # What the last frame rendered for the current slide shows, which native waits hold (None before its first one)
+        self.renderedState = None
+        # Frame the current slide started with (captured from the camera when its first animation begins)
+        self.slideStartFrame = None
+        # Waits of the current slide that are left to PowerPoint, as [offset into the video, duration] in milliseconds
+        self.slideNativeWaits = list()
+        # Stand-ins for the slide videos, swapped for the videos when the PowerPoint is saved (see stream_media)
+        self.mediaPlaceholders = MediaPlaceholders()
+        # Name of the Slide being constructed (set by Slide.constructProtocol), which identifies its slide in the deck
+        self.currentSlideName = None
+        self.currentSlideCode = None
+        # How long each stage of the build took, in seconds
+        self.stageTimings = dict()
+        # When the animations of the current slide started (i.e. when the slide before it ended), to time each slide
+        self.slideStartTime = None
+        # Slides finished by a previous (failed) build, which are fast-forwarded through while they still match
+        self.checkpointFile = None
+        self.resumeSlides = list()
+        self.resuming = False
+        # Records of the slides of the last build (by name, in order) that can be reused (see reuse_slides), the record
+        # the current slide reuses (None when it's rendered), and the fingerprint of the state the current slide starts
+        # from
+        self.previousSlides = dict()
+        self.reusedSlide = None
+        self.slideState = None
+        # Whether the current slide is selected (see select_slides), and manim's skipping status from before the
+        # animations started being skipped to fast-forward through slides (None while they aren't)
+        self.slideSelected = True
+        self.fastForwardStatus = None
+        # Names of the slides (each with the names of its parents) in the order they're constructed, when it's known
+        # beforehand, so the animations after a slide ends are rendered (or skipped) with the slide they belong to
+        self.slideOrder = None
+        # Numbers of the only slides that are rendered, the others are fast-forwarded through (see Topic's
+        # parallel_slides, which renders each slide in a process of its own)
+        self.renderSlides = None
+        # Whether the selected slides are only fast-forwarded through and recorded, to be rendered later
+        self.deferSlides = False
 
         self.currentSlide = 1
         self.currentAnimation = 0
@@ -124,16 +262,96 @@ class PPTXScene(manim.ThreeDScene):
             manim.config.max_files_cached = new_max_files
             pass
         super(PPTXScene, self).play(*args, **kwargs)
+        self.animationFrames.append(self.__playedFrames__())
+        self.animationStatic.append(self.is_current_animation_frozen_frame())
+        frozen_state = self.static_slides_as_pictures and self.animationStatic[-1]
+        if self.renderer.file_writer.partial_movie_files[-1] is not None and (self.native_waits or frozen_state):
+            self.renderedState = self.__stateFingerprint__()
+            if frozen_state:
+                self.slideFrozenStates.append(self.renderedState)
+                pass
+            pass
         self.currentAnimation += 1
         self.currentSlideAnimations += 1
         logger.log(PPTX_INFO, f"Add animation: {self.currentAnimation}")
         pass
 
-    def wait(self, *args, **kwargs):
-        super(PPTXScene, self).wait(*args, **kwargs)
+    def wait(self, duration=manim.DEFAULT_WAIT_TIME, stop_condition=None, frozen_frame=None):
+        if self.native_waits and self.__isNativeWait__(stop_condition, frozen_frame):
+            self.__addNativeWait__(duration)
+            return
+        # manim plays waits as "Wait" animations, so they are counted (and their frames recorded) by self.play
+        super(PPTXScene, self).wait(duration, stop_condition=stop_condition, frozen_frame=frozen_frame)
         # self.currentAnimation += 1
         pass
 
+    def __isNativeWait__(self, stop_condition=None, frozen_frame=None):
+        """Whether a wait would only repeat the current frame, so PowerPoint can do the waiting instead."""
+        if stop_condition is not None or frozen_frame is False:
+            return False
+        if None in self.animationFrames[self.slideStartAnimation:self.currentAnimation]:
+            # the position of the wait within the slide's video isn't known
+            return False
+        if self.renderedState is None or self.__stateFingerprint__() != self.renderedState:
+            # The last frame of the slide's video doesn't show the mobjects added or removed (or the camera moved) since
+            # it was rendered, so the wait renders a frame that does
+            return False
+        # see manim.scene.scene.Scene.should_update_mobjects
+        return frozen_frame or not (
+                self.always_update_mobjects
+                or self.updaters
+                or any(mob.has_time_based_updater() for mob in self.get_mobject_family_members())
+        )
+
+    def __addNativeWait__(self, duration: float):
+        """Record a wait at the current position in the slide's video instead of rendering it."""
+        offset = sum(self.animationFrames[self.slideStartAnimation:self.currentAnimation])
+        self.slideNativeWaits.append([
+            round(offset * 1000 / manim.config.frame_rate),  # milliseconds into the slide's video
+            round(duration * 1000),  # milliseconds
+        ])
+        # keep the scene's time consistent with rendering the wait
+        self.renderer.time += duration
+        logger.log(PPTX_DEBUG, f"Native wait of {duration}s in slide {self.currentSlide}")
+        pass
+
+    def begin_animations(self):
+        super(PPTXScene, self).begin_animations()
+        if self.currentSlideAnimations == 0 and self.renderer.file_writer.partial_movie_files[-1] is not None:
+            # This is the state the first frame of the slide's video is rendered from
+            self.slideStartFrame = self.__captureFrame__()
+            pass
+        pass
+
+    def __captureFrame__(self):
+        """
+        Render the current state of the scene, with all of its mobjects, and return the frame.
+
+        This doesn't use the renderer's static image, since it may be left over from the previous animation.
+        """
+        self.camera.reset()
+        self.camera.capture_mobjects(list_update(self.mobjects, self.foreground_mobjects))
+        return numpy.array(self.camera.pixel_array)
+
+    def __playedFrames__(self):
+        """
+        Number of frames manim wrote for the last call to self.play.
+
+        This mirrors how the renderer counts frames (see manim.renderer.cairo_renderer.CairoRenderer.play), so the
+        durations of the slides match the videos without having to probe them.
+        """
+        if self.renderer.file_writer.partial_movie_files[-1] is None:
+            # skipped animation, nothing was written
+            return 0
+        if self.is_current_animation_frozen_frame():
+            # see manim.renderer.cairo_renderer.CairoRenderer.freeze_current_frame
+            return int(self.duration / (1 / manim.config.frame_rate))
+        if self.stop_condition is not None:
+            # waits with a stop condition end whenever the condition is met
+            return None
+        # see manim.scene.scene.Scene.get_time_progression
+        return len(numpy.arange(0, self.duration, 1 / manim.config.frame_rate))
+
     @staticmethod
     def __process_notes__(notes: str):
         """
@@ -141,18 +359,8 @@ class PPTXScene(manim.ThreeDScene):
 
         Because of this, we can use triple quotes to generate notes without un-indenting every line.
         """
-        # Strip any leading and trailing whitespace from notes string
-        notes = notes.strip()
-        # Replace all occurrences of two or more spaces with a single space
-        #   EXCEPT when preceded by a punctuation mark
-        notes = not_preceded_pattern.sub(' ', notes)
-        # Remove leading white space from new lines.
-        #   (Here we match with just a single space because we reduced all
-        #   multiple space substrings to single spaces in the previous step)
-        notes = line_start_pattern.sub('', notes)
-        # This is equivalent to:
-        #   return line_start_pattern.sub('', not_preceded_pattern.sub(' ', notes.strip()))
-        return notes
+        # This is shared with the notes command (see PresentationNotes), which reads the notes without rendering
+        return processNotes(notes)
 
     def all_endSlide(self, loop=False, autonext=False, notes=None, shownextnotes=False):
         warnings.warn("The 'all_endSlide' method is deprecated, "
@@ -181,86 +389,533 @@ class PPTXScene(manim.ThreeDScene):
         logger.log(PPTX_INFO,
                    f"End slide: {self.currentSlide} with animations "
                    f"[{self.slideStartAnimation},  {self.currentAnimation}]")
+        if self.resuming:
+            # The slide was finished by the previous build, so its record (and media) are reused
+            slide_info = dict(self.resumeSlides[len(self.slides)])
+            slide_info.update(start=self.slideStartAnimation, end=self.currentAnimation, number=self.currentSlide)
+            self.slides.append(slide_info)
+            self.__nextSlide__()
+            return
+        if self.reusedSlide is not None:
+            # The slide is the same as in the last build, so its record (and media) are reused (see reuse_slides)
+            slide_info = dict(self.reusedSlide, reused=True)
+            slide_info.update(start=self.slideStartAnimation, end=self.currentAnimation, number=self.currentSlide)
+            self.slides.append(slide_info)
+            self.__nextSlide__()
+            self.__saveCheckpoint__()
+            return
         slide_info = dict(
             type="loop" if loop else "slide",
             start=self.slideStartAnimation,
             end=self.currentAnimation,
             number=self.currentSlide,
+            # Wall time the slide took to construct and render, which the next builds schedule slides by (see
+            # PresentationSchedule)
+            seconds=None if self.slideStartTime is None else time.perf_counter() - self.slideStartTime,
+            name=self.currentSlideName or f"slide_{self.currentSlide}",
+            code=self.currentSlideCode,
+            state=self.slideState,
             autonext=autonext,
             notes=notes if notes is None else self.__process_notes__(notes),
             shownextnotes=shownextnotes,
         )
-        slide_info.update(
-            self.__combineSlideAnimations__(self.currentSlide, self.slideStartAnimation, self.currentAnimation))
+        if not self.slideSelected:
+            # The slide was only fast-forwarded through (see select_slides), so it has no media and isn't in the deck
+            slide_info['skipped'] = True
+            self.slides.append(slide_info)
+            self.__nextSlide__()
+            self.__saveCheckpoint__()
+            return
+        if self.deferSlides:
+            # The slide is rendered later (see Topic's parallel_slides), which replaces this record
+            slide_info['deferred'] = True
+            self.slides.append(slide_info)
+            self.__nextSlide__()
+            return
+        slide_info['partial_movie_files'] = self.renderer.file_writer.partial_movie_files[self.slideStartAnimation:
+                                                                                         self.currentAnimation]
+        slide_frames = self.animationFrames[self.slideStartAnimation:self.currentAnimation]
+        if None not in slide_frames:
+            slide_info['frames'] = sum(slide_frames)
+            slide_info['duration'] = round(slide_info['frames'] * 1000 / manim.config.frame_rate)  # milliseconds
+            pass
+        slide_info['waits'] = self.slideNativeWaits
+        # Take the partial movie files now, the list keeps growing while the slide is combined in the background
+        slide_movie_files = slide_info['partial_movie_files']
+        # Slides where nothing moves (i.e. only waits, with the same mobjects and camera during each of them and at the
+        # end of the slide, when the picture is captured) are shown as a picture instead of a video
+        slide_info['static'] = (not any(slide_movie_files) or
+                                self.static_slides_as_pictures and
+                                all(self.animationStatic[self.slideStartAnimation:self.currentAnimation]) and
+                                len(set(self.slideFrozenStates + [self.__stateFingerprint__()])) == 1)
+        if slide_info['static']:
+            media_job = (self.__saveSlidePicture__, self.currentSlide, self.__captureFrame__())
+            pass
+        else:
+            poster_frame = self.__captureFrame__() if self.poster_frame == "last" else self.slideStartFrame
+            media_job = (self.__combineSlideAnimations__, self.currentSlide, slide_movie_files, poster_frame)
+            pass
+        if self.media_workers:
+            if self.mediaPool is None:
+                self.mediaPool = concurrent.futures.ThreadPoolExecutor(max_workers=self.media_workers,
+                                                                       thread_name_prefix="PPTXMedia")
+                pass
+            self.mediaJobs.append((slide_info, self.mediaPool.submit(*media_job)))
+            pass
+        else:
+            slide_info.update(media_job[0](*media_job[1:]))
+            pass
         self.slides.append(slide_info)
+        self.__nextSlide__()
+        self.__saveCheckpoint__()
+        pass
+
+    def __nextSlide__(self):
+        """Reset the state kept for the slide that just ended."""
+        ended_reused = self.reusedSlide is not None
+        self.reusedSlide = None
+        self.slideState = None
+        self.slideStartFrame = None
+        self.slideNativeWaits = list()
+        self.slideFrozenStates = list()
+        self.renderedState = None
+        self.currentSlideName = None
+        self.currentSlideCode = None
+        self.slideSelected = True
 
         self.currentSlide += 1
         self.slideStartAnimation = self.currentAnimation
         self.currentSlideAnimations = 0
+        self.slideStartTime = time.perf_counter()
+        if self.slideOrder is not None and self.currentSlide <= len(self.slideOrder):
+            # The animations after a slide ends are the start of the next slide's video
+            names = self.slideOrder[self.currentSlide - 1]
+            self.slideSelected = self.__isRendered__(self.currentSlide, names)
+            if self.slideSelected and ended_reused and self.__reusableSlide__(names[0]) is not None:
+                # The next slide starts where it did in the last build as well, unless its code changed (which is
+                # checked when it begins), so it's reused along with these animations
+                self.slideSelected = False
+                pass
+            self.__fastForward__(self.resuming or not self.slideSelected or self.deferSlides)
+            pass
         pass
 
+    def __beginSlide__(self, name: str, fingerprint: str = None, parents: List[str] = ()):
+        """
+        Start the slide name (called by Slide.constructProtocol), where fingerprint identifies the code it's made with
+        and parents are the names of the slides it's a child of.
+
+        When resuming, slides that match the ones the previous build finished are fast-forwarded, i.e. their animations
+        are skipped, until the first slide that doesn't.  Slides that aren't selected (see select_slides) are
+        fast-forwarded as well, and so are the slides that are deferred (see deferSlides), and those reused from the
+        last build (see reuse_slides).
+        """
+        self.currentSlideName = name
+        if self.slideStartTime is None:
+            self.slideStartTime = time.perf_counter()
+            pass
+        self.slideSelected = self.__isRendered__(self.currentSlide, [name, *parents])
+        slide_index = len(self.slides)
+        resumable = False
+        if slide_index < len(self.resumeSlides):
+            record = self.resumeSlides[slide_index]
+            resumable = (record.get('name') == name and record.get('code') == fingerprint and
+                         all(record.get(key) is None or os.path.isfile(record[key])
+                             for key in ('slide_movie_file', 'thumbnail_file')))
+            pass
+        if resumable and not self.resuming:
+            logger.log(PPTX_INFO, f"Resuming from the previous build: fast-forwarding through the "
+                                  f"{len(self.resumeSlides) - slide_index} slides it finished.")
+            self.resuming = True
+            pass
+        elif not resumable and self.resuming:
+            logger.log(PPTX_INFO, f"Resumed at slide {self.currentSlide} ({name}).")
+            self.__stopResuming__()
+            pass
+        elif not resumable:
+            # Slides after one that changed can't be reused either
+            self.resumeSlides = list()
+            pass
+        if not self.slideSelected:
+            logger.log(PPTX_DEBUG, f"Fast-forwarding through slide {self.currentSlide} ({name}), it isn't selected.")
+            pass
+        self.slideState = self.__stateFingerprint__()
+        if self.slideSelected and not self.resuming and self.previousSlides:
+            self.reusedSlide = self.__reusableSlide__(name, fingerprint, self.slideState)
+            self.slideSelected = self.reusedSlide is None
+            logger.log(PPTX_DEBUG, f"Slide {self.currentSlide} ({name}) " +
+                       ("is reused from the last build." if self.reusedSlide is not None else
+                        "changed since the last build, rendering it."))
+            pass
+        self.__fastForward__(self.resuming or not self.slideSelected or self.deferSlides)
+        self.currentSlideCode = fingerprint
+        pass
+
+    def __stopResuming__(self):
+        self.resuming = False
+        self.resumeSlides = list()
+        self.__fastForward__(False)
+        pass
+
+    def __fastForward__(self, fast_forward: bool):
+        """Start (or stop) skipping the animations."""
+        # manim skips the animations (without writing any partial movie files) while this is set, see
+        # manim.renderer.cairo_renderer.CairoRenderer.play
+        # noinspection PyProtectedMember
+        if fast_forward and self.fastForwardStatus is None:
+            self.fastForwardStatus = self.renderer._original_skipping_status
+            self.renderer._original_skipping_status = True
+            pass
+        elif not fast_forward and self.fastForwardStatus is not None:
+            self.renderer._original_skipping_status = self.fastForwardStatus
+            self.fastForwardStatus = None
+            pass
+        pass
+
+    def __isSelected__(self, names: List[str]) -> bool:
+        """Whether the slide with the (qualified, i.e. "<Topic>.<slide>") names matches select_slides."""
+        if self.select_slides is None:
+            return True
+        # Patterns without a Topic match the slide name alone
+        return any(fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(name.rsplit(".", 1)[-1], pattern)
+                   for name in names for pattern in self.select_slides)
+
+    def __isRendered__(self, number: int, names: List[str]) -> bool:
+        """Whether slide number (with the names) is rendered, rather than fast-forwarded through."""
+        return (self.renderSlides is None or number in self.renderSlides) and self.__isSelected__(names)
+
+    def __reusableSlide__(self, name: str, fingerprint: str = None, state: str = None) -> Optional[dict]:
+        """
+        Record of the slide name in the last build, when it can be reused: it's made with the same code (fingerprint)
+        and starts from the same state, and its media are still there.
+        """
+        record = self.previousSlides.get(name)
+        if record is None or fingerprint is not None and record.get('code') != fingerprint or \
+                state is not None and record.get('state') != state:
+            return None
+        if not all(record.get(key) is None or os.path.isfile(record[key])
+                   for key in ('slide_movie_file', 'thumbnail_file')):
+            return None
+        return record
+
+    def __stateFingerprint__(self) -> str:
+        """Fingerprint of what's on screen (the points and colors of the mobjects) and of the camera's orientation."""
+        fingerprint = hashlib.sha256()
+        for mobject in self.get_mobject_family_members():
+            fingerprint.update(type(mobject).__name__.encode())
+            for key in ('points', 'fill_rgbas', 'stroke_rgbas', 'background_stroke_rgbas', 'rgbas', 'pixel_array'):
+                value = getattr(mobject, key, None)
+                if isinstance(value, numpy.ndarray):
+                    fingerprint.update(value.tobytes())
+                    pass
+                pass
+            fingerprint.update(repr((getattr(mobject, 'stroke_width', None), mobject.z_index)).encode())
+            pass
+        fingerprint.update(repr((self.camera.get_phi(), self.camera.get_theta(), self.camera.get_gamma(),
+                                 self.camera.get_zoom(), self.camera.get_focal_distance())).encode())
+        return fingerprint.hexdigest()[:16]
+
+    def __previousSlides__(self, manifest: BuildManifest, presentation_name: str) -> dict:
+        """Records (by name) of the slides of the last build, when it was made with the same settings."""
+        build = manifest.lastBuild(presentation_name)
+        if build is None:
+            return dict()
+        settings = json.loads(json.dumps(self.__reuseSettings__(), default=str))
+        changed = [key for key, value in settings.items() if build['settings'].get(key) != value]
+        if changed:
+            logger.log(PPTX_INFO, f"Rendering every slide, the last build of {presentation_name} was made with other "
+                                  f"settings ({', '.join(changed)}).")
+            return dict()
+        return {record['name']: record for record in manifest.buildSlides(build['id'])}
+
+    def __reuseSettings__(self) -> dict:
+        """Settings the slides of the last build have to be made with to be reused (see Topic, which adds the code)."""
+        return self.__checkpointSettings__()
+
+    def __presentationName__(self) -> str:
+        """Name of the PowerPoint (without its extension), which is a preview when only some slides are selected."""
+        presentation_name = getattr(type(self), "__presentation_name__", type(self).__name__)
+        return presentation_name if self.select_slides is None else presentation_name + "_preview"
+
+    def __saveCheckpoint__(self):
+        """Save the slides that are finished, including their media, for a later build to resume from."""
+        if self.checkpointFile is None:
+            return
+        jobs = {id(slide_info): job for slide_info, job in self.mediaJobs}
+        finished_slides = list()
+        for slide_info in self.slides:
+            job = jobs.get(id(slide_info))
+            if job is not None and job.done() and job.exception() is None:
+                finished_slides.append(dict(slide_info, **job.result()))
+                pass
+            elif job is None and ('thumbnail_file' in slide_info or slide_info.get('skipped')):
+                finished_slides.append(dict(slide_info))
+                pass
+            else:
+                break
+            pass
+        checkpoint = dict(settings=self.__checkpointSettings__(), slides=finished_slides)
+        with open(self.checkpointFile + ".partial", "w") as file:
+            json.dump(checkpoint, file, default=str)
+            pass
+        os.replace(self.checkpointFile + ".partial", self.checkpointFile)
+        pass
+
+    def __loadCheckpoint__(self):
+        """Load the slides finished by a previous build with the same settings, if it saved any."""
+        if self.checkpointFile is None or not os.path.isfile(self.checkpointFile):
+            return
+        try:
+            with open(self.checkpointFile) as file:
+                checkpoint = json.load(file)
+                pass
+            pass
+        except (OSError, ValueError) as e:
+            logger.log(PPTX_WARNING, f"Ignoring the checkpoint {self.checkpointFile}, it can't be read: {e}")
+            return
+        if checkpoint.get('settings') != json.loads(json.dumps(self.__checkpointSettings__(), default=str)):
+            logger.log(PPTX_INFO, f"Ignoring the checkpoint {self.checkpointFile}, it was made with other settings.")
+            return
+        self.resumeSlides = checkpoint.get('slides', [])
+        pass
+
+    def __checkpointSettings__(self) -> dict:
+        """Settings the slides of a checkpoint depend on (see Topic, which adds the code of the setups)."""
+        settings = self.__buildSettings__()
+        for key in output_settings:
+            settings.pop(key)
+            pass
+        return settings
+
     @staticmethod
-    def __combinationHash__(slide_movie_files: List[str]):
+    def __combinationHash__(slide_movie_files: List[str], *settings) -> str:
+        """
+        Deterministic fingerprint of the combined video for a slide.
+
+        Partial movie files cached by manim are identified by their names (which are the hashes manim computed for
+        them), any other partial movie files (e.g. when manim.config.disable_caching is set) are identified by their
+        contents.  The render settings are included so that the same animations rendered at a different resolution,
+        frame rate, or codec don't share a combined video.  Unlike the built-in hash, this is stable between runs.
+        """
         # TODO (2023-03-12 @ 08:21:54): add timing and logging as seen in manim.utils.hashing.get_hash_from_play_call
-        max_hash_value = 2 ** 32
-        nl = '\n\t'
-        n_hash_values = 3
-
-        stripped_movie_files = [os.path.splitext(file)[0] for file in map(os.path.basename, slide_movie_files)]
-        split_movie_hashes = [tuple(map(int, movie_file.split('_'))) for movie_file in stripped_movie_files]
-        # make sure there are three hash values for each movie file
-        assert all(map(n_hash_values.__eq__, map(len, split_movie_hashes))), \
-            f'There must be {n_hash_values} hash values for every movie file.' \
-            f'\n\t{nl.join(stripped_movie_files)}'
-
-        hash_camera, hash_animations, hash_current_mobjects = (
-            hash(hash_tuple) // max_hash_value
-            for hash_tuple in zip(*split_movie_hashes)
+        fingerprint = hashlib.sha256()
+        for movie_file in slide_movie_files:
+            movie_name = os.path.basename(movie_file)
+            if cached_movie_pattern.fullmatch(os.path.splitext(movie_name)[0]):
+                fingerprint.update(movie_name.encode())
+                pass
+            else:
+                with open(movie_file, 'rb') as file:
+                    for chunk in iter(lambda: file.read(1 << 20), b''):
+                        fingerprint.update(chunk)
+                        pass
+                    pass
+                pass
+            fingerprint.update(b'\n')
+            pass
+        fingerprint.update(repr(settings).encode())
+        return fingerprint.hexdigest()
+
+    @staticmethod
+    def __combinationSettings__() -> tuple:
+        """Render settings that change the contents of a combined video without changing the partial movie names."""
+        return (
+            manim.config.pixel_width,
+            manim.config.pixel_height,
+            manim.config.frame_rate,
+            # the codec is chosen by manim from the extension and transparency
+            manim.config.movie_file_extension,
+            manim.config.transparent,
         )
-        hash_complete = f"{hash_camera}_{hash_animations}_{hash_current_mobjects}"
-        return hash_complete
 
-    def __combineSlideAnimations__(self, slide_number: int, start_index: int, end_index: int):
-        """Combine all animations for the slide into a single video."""
-        slide_movie_files = self.renderer.file_writer.partial_movie_files[start_index:end_index]
+    def __combineSlideAnimations__(self, slide_number: int, slide_movie_files: List[str],
+                                   poster_frame: numpy.ndarray = None):
+        """Combine all animations for the slide into a single video, and save its poster frame."""
+        try:
+            return self.__combineSlideMovieFiles__(slide_number, slide_movie_files, poster_frame)
+        except Exception as e:
+            # This usually runs in a media worker, so make sure the error can be traced back to its slide
+            raise RuntimeError(f'Combining the animations for slide {slide_number} failed: {e}') from e
+
+    def __combineSlideMovieFiles__(self, slide_number: int, slide_movie_files: List[str],
+                                   poster_frame: numpy.ndarray = None):
+        # skipped animations don't have partial movie files
+        slide_movie_files = [movie_file for movie_file in slide_movie_files if movie_file is not None]
         first_movie_file = slide_movie_files[0]
-        last_movie_file = slide_movie_files[-1]  # Use this to make slides show their destination instead of start
-
-        # TODO (2023-03-05 @ 11:40:39): hash combined video (just hash combination of the contributing video hashes)
-        #  so it can be reused (although this barely takes any time once the component videos are made, so maybe
-        #  don't bother)
-        #  ALSO need to make sure the number of combined videos isn't growing out of control when doing this
-        #       i.e. add a slide_# identifier and a self.__class__.__name__ identifier or some sort of other data to
-        #       help determine when one video should replace another
-        #       (or make it time based, at the end of the render sequence, excluding the videos used for this
-        #       particular presentation)
-        slide_hash = self.__combinationHash__(slide_movie_files)
-        slide_movie_file = os.path.join(self.temporary_dir,
-                                        f"slide_{slide_number}" +
-                                        # slide_hash +
-                                        os.path.splitext(os.path.basename(first_movie_file))[1])
-
-        # This is very messy, and should eventually use more of the components seen in
-        # manim.scene.scene_file_writer.py
-        logger.log(PPTX_DEBUG, f"Combining animations [{start_index}, {end_index}]")
-        self.renderer.file_writer.combine_files(slide_movie_files, slide_movie_file,
-                                                create_gif=False, includes_sound=False)
-
-        # Create thumbnail for animation
-        thumbnail_file = os.path.join(
-            self.temporary_dir,
-            # os.path.splitext(os.path.basename(first_movie_file))[0] + ".png"
-            f"slide_{slide_number}_thumbnail.png"
-        )
-        self.save_video_thumb(first_movie_file, thumbnail_file)
-        # self.save_video_thumb(last_movie_file, thumbnail_file)
+        movie_extension = os.path.splitext(os.path.basename(first_movie_file))[1]
+
+        if self.use_slide_cache:
+            # Combined videos are content addressed, so a slide that didn't change since the last run (or the same
+            # animations reused in another Topic) picks up the video that was already combined.
+            # TODO (2023-03-05 @ 11:40:39): make sure the number of combined videos in the cache isn't growing out of
+            #  control, i.e. remove the entries that weren't used by a presentation for a while
+            slide_hash = self.__combinationHash__(slide_movie_files, *self.__combinationSettings__())
+            slide_movie_file = os.path.join(self.cache_dir, slide_hash + movie_extension)
+            # Write to a temporary name first so an interrupted run doesn't leave partial entries in the cache
+            # (ffmpeg picks the format from the extension, so the extension is kept), which is unique to the process
+            # since Topics built at the same time share the cache
+            combine_target = os.path.join(self.cache_dir, f"{slide_hash}.{processTag()}.partial" + movie_extension)
+            pass
+        else:
+            slide_movie_file = os.path.join(self.temporary_dir,
+                                            f"{self.__presentationName__()}_slide_{slide_number}" + movie_extension)
+            combine_target = slide_movie_file
+            pass
+
+        if os.path.isfile(slide_movie_file) and combine_target != slide_movie_file:
+            logger.log(PPTX_DEBUG, f"Using cached combination of animations for slide {slide_number}")
+            pass
+        else:
+            logger.log(PPTX_DEBUG, f"Combining {len(slide_movie_files)} animations for slide {slide_number}")
+            self.concatMovieFiles(slide_movie_files, combine_target)
+            if combine_target != slide_movie_file:
+                os.replace(combine_target, slide_movie_file)
+                pass
+            pass
+
+        if poster_frame is None:
+            # The first frame wasn't captured (e.g. the slide's first animation was skipped), so decode it instead
+            first_frame_file = os.path.join(self.temporary_dir,
+                                            f"{self.__presentationName__()}_slide_{slide_number}_first_frame.png")
+            self.save_video_thumb(first_movie_file, first_frame_file)
+            with PIL.Image.open(first_frame_file) as first_frame:
+                poster_frame = numpy.array(first_frame)
+                pass
+            pass
 
         return_data = {
             'slide_movie_file': slide_movie_file,
-            'thumbnail_file': thumbnail_file,
+            'thumbnail_file': self.__savePoster__(slide_number, poster_frame),
         }
         return return_data
 
+    def __savePoster__(self, slide_number: int, frame: numpy.ndarray, scale: float = None) -> str:
+        """
+        Encode the poster frame of a slide with the poster settings and return the image file.
+
+        Posters are content addressed by the frame and the settings, so repeated slides and rebuilds reuse the image.
+        """
+        frame_height, frame_width = frame.shape[:2]
+        scale = self.poster_scale if scale is None else scale
+        # Posters are never upscaled
+        poster_size = (max(1, min(frame_width, round(self.camera.pixel_width * scale))),
+                       max(1, min(frame_height, round(self.camera.pixel_height * scale))))
+        poster_extension = poster_extensions[self.poster_format]
+
+        if self.use_slide_cache:
+            poster_hash = hashlib.sha256(frame.tobytes())
+            poster_hash.update(repr((frame.shape, self.poster_format, self.poster_quality, poster_size)).encode())
+            poster_dir = os.path.join(self.cache_dir, "posters")
+            poster_file = os.path.join(poster_dir, poster_hash.hexdigest() + poster_extension)
+            if os.path.isfile(poster_file):
+                logger.log(PPTX_DEBUG, f"Using cached poster for slide {slide_number}")
+                return poster_file
+            if not os.path.exists(poster_dir):
+                os.makedirs(poster_dir, exist_ok=True)
+                pass
+            poster_target = os.path.join(poster_dir, f"{poster_hash.hexdigest()}.{processTag()}.partial" +
+                                         poster_extension)
+            pass
+        else:
+            poster_file = os.path.join(self.temporary_dir,
+                                       f"{self.__presentationName__()}_slide_{slide_number}_thumbnail" +
+                                       poster_extension)
+            poster_target = poster_file
+            pass
+
+        self.save_frame_thumb(frame, poster_target, self.poster_format, self.poster_quality, poster_size)
+        if poster_target != poster_file:
+            os.replace(poster_target, poster_file)
+            pass
+        return poster_file
+
+    def __saveSlidePicture__(self, slide_number: int, frame: numpy.ndarray):
+        """Save the picture shown for a static slide."""
+        try:
+            # The picture is the whole slide, so it isn't downscaled like a poster
+            return {
+                'slide_movie_file': None,
+                'thumbnail_file': self.__savePoster__(slide_number, frame, scale=1.0),
+            }
+        except Exception as e:
+            raise RuntimeError(f'Saving the picture for static slide {slide_number} failed: {e}') from e
+
+    def __waitForMediaJobs__(self, cancel=False):
+        """Wait for the slides being combined in the background and add their videos and thumbnails to the slides."""
+        failures = list()
+        for slide_info, job in self.mediaJobs:
+            if cancel and job.cancel():
+                continue
+            try:
+                slide_info.update(job.result())
+                pass
+            except Exception as e:
+                logger.error(str(e))
+                failures.append(e)
+                pass
+            pass
+        self.mediaJobs.clear()
+        if self.mediaPool is not None:
+            self.mediaPool.shutdown()
+            self.mediaPool = None
+            pass
+        if failures and not cancel:
+            raise failures[0]
+        pass
+
+    def tear_down(self):
+        # manim may clean partial movie files out of its cache once the scene is finished, so the slides have to be
+        # done with them before then
+        self.__waitForMediaJobs__()
+        return super(PPTXScene, self).tear_down()
+
+    @staticmethod
+    def concatMovieFiles(movie_files: List[str], output_file: str):
+        """
+        Concatenate movie files with ffmpeg, without re-encoding them.
+
+        This is the same as manim's SceneFileWriter.combine_files, except that the list of input files is written next
+        to the output file instead of to a single file for the whole scene, so multiple slides can be combined at once.
+        """
+        file_list = output_file + ".txt"
+        with open(file_list, 'w', encoding='utf-8') as fp:
+            fp.write("# This file is used internally by FFMPEG.\n")
+            for movie_file in movie_files:
+                fp.write(f"file 'file:{pathlib.Path(os.path.abspath(movie_file)).as_posix()}'\n")
+                pass
+            pass
+        subprocess.run([
+            manim.config.ffmpeg_executable,
+            '-y',  # overwrite
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', file_list,
+            '-loglevel', manim.config.ffmpeg_loglevel.lower(),
+            '-metadata', f'comment=Rendered with Manim Community v{manim.__version__}',
+            '-nostdin',
+            '-c', 'copy',
+            '-an',  # no sound
+            output_file,
+        ], check=True)
+        os.remove(file_list)
+        return output_file
+
+    @staticmethod
+    def save_frame_thumb(frame: numpy.ndarray, image_name, image_format="png", quality=85, size=None):
+        """Save a frame captured from the camera as a PNG or JPEG image, optionally resized to (width, height)."""
+        image = PIL.Image.fromarray(frame)
+        if size is not None and tuple(size) != image.size:
+            image = image.resize(tuple(size), PIL.Image.LANCZOS)
+            pass
+        if image_format == "jpeg":
+            # JPEG doesn't support transparency
+            image.convert("RGB").save(image_name, "JPEG", quality=quality, optimize=True)
+            pass
+        else:
+            image.save(image_name, "PNG")
+            pass
+        return image_name
+
     @staticmethod
     def save_video_thumb(filename, image_name):
         subprocess.run([
@@ -278,7 +933,14 @@ class PPTXScene(manim.ThreeDScene):
 
     @staticmethod
     def get_dur(filename):
-        return int(float(subprocess.check_output([
+        """Duration of a movie file in milliseconds."""
+        try:
+            return round(PPTXScene.readMovieDuration(filename) * 1000)
+        except (ValueError, struct.error, OSError):
+            # Not an MP4 (ISO base media) file (e.g. webm), or one that's truncated
+            logger.log(PPTX_DEBUG, f"Probing duration of {filename} with ffprobe")
+            pass
+        return round(float(subprocess.check_output([
             "ffprobe",
             '-i', filename,
             "-show_entries", "format=duration",  # show duration
@@ -286,6 +948,90 @@ class PPTXScene(manim.ThreeDScene):
             "-of", "csv=p=0",  # only number
         ]).decode("utf-8").strip()) * 1000)
 
+    @staticmethod
+    def readMovieDuration(filename) -> float:
+        """
+        Duration, in seconds, of an MP4 (or QuickTime) file as recorded in its movie header ("mvhd") box.
+
+        When the movie header doesn't have a duration (e.g. fragmented files) the longest media header ("mdhd") of
+        its tracks is used instead.  Raises a ValueError when the file doesn't have these boxes (or ends within them).
+        """
+        with open(filename, 'rb') as file:
+            file_size = os.fstat(file.fileno()).st_size
+            moov = next((box for box in PPTXScene.__iterBoxes__(file, 0, file_size) if box[0] == b'moov'), None)
+            if moov is None:
+                raise ValueError(f'{filename} does not have a movie ("moov") box.')
+            movie_duration = 0.
+            track_durations = [0.]
+            for box_type, start, end in PPTXScene.__iterBoxes__(file, moov[1], moov[2]):
+                if box_type == b'mvhd':
+                    movie_duration = PPTXScene.__readHeaderDuration__(file, start)
+                    pass
+                elif box_type == b'trak':
+                    for mdia_type, mdia_start, mdia_end in PPTXScene.__iterBoxes__(file, start, end):
+                        if mdia_type == b'mdia':
+                            track_durations.extend(PPTXScene.__readHeaderDuration__(file, mdhd_start)
+                                                   for mdhd_type, mdhd_start, _ in
+                                                   PPTXScene.__iterBoxes__(file, mdia_start, mdia_end)
+                                                   if mdhd_type == b'mdhd')
+                            pass
+                        pass
+                    pass
+                pass
+            pass
+        duration = movie_duration or max(track_durations)
+        if not duration:
+            raise ValueError(f'No duration was found in the header boxes of {filename}.')
+        return duration
+
+    @staticmethod
+    def __iterBoxes__(file, start: int, end: int):
+        """Yield the type, payload start, and end offsets of the ISO base media boxes in file[start:end]."""
+        position = start
+        while position + 8 <= end:
+            file.seek(position)
+            size, box_type = struct.unpack('>I4s', PPTXScene.__readBytes__(file, 8))
+            payload = position + 8
+            if size == 1:  # 64-bit size follows the type
+                size, = struct.unpack('>Q', PPTXScene.__readBytes__(file, 8))
+                payload += 8
+                pass
+            elif size == 0:  # box extends to the end of its container
+                size = end - position
+                pass
+            if size < payload - position:
+                raise ValueError(f'Malformed "{box_type.decode(errors="replace")}" box at byte {position}.')
+            yield box_type, payload, position + size
+            position += size
+            pass
+        pass
+
+    @staticmethod
+    def __readHeaderDuration__(file, start: int) -> float:
+        """Duration, in seconds, from the payload of a movie ("mvhd") or media ("mdhd") header box."""
+        file.seek(start)
+        version = PPTXScene.__readBytes__(file, 4)[0]
+        if version == 1:
+            # 64-bit creation and modification times and duration
+            timescale, duration = struct.unpack('>16xIQ', PPTXScene.__readBytes__(file, 28))
+            unknown = 2 ** 64 - 1
+            pass
+        else:
+            timescale, duration = struct.unpack('>8xII', PPTXScene.__readBytes__(file, 16))
+            unknown = 2 ** 32 - 1
+            pass
+        if not timescale or duration == unknown:
+            return 0.
+        return duration / timescale
+
+    @staticmethod
+    def __readBytes__(file, size: int) -> bytes:
+        """Read size bytes from file, raising a ValueError when it ends before them (e.g. a truncated movie)."""
+        data = file.read(size)
+        if len(data) < size:
+            raise ValueError(f'Unexpected end of file at byte {file.tell()}, {size} bytes were expected.')
+        return data
+
     def old_render(self, *args, **kwargs):
         warnings.warn("The 'old_render' method is deprecated, "
                       "use 'render' instead", DeprecationWarning, 2)
@@ -569,14 +1315,20 @@ class PPTXScene(manim.ThreeDScene):
         pass
 
     def render(self, *args, **kwargs):
-        presentation_name = getattr(type(self), "__presentation_name__", type(self).__name__) + '.pptx'
+        presentation_name = self.__presentationName__() + '.pptx'
         presentation_path = os.path.join(self.output_folder, presentation_name)
         # Check if file already exists
         if os.path.isfile(presentation_path):
             # Check to make sure saving the resulting power point will be possible before spending time to create it
             try:
-                os.remove(presentation_path)
-                logger.log(PPTX_INFO, f'Removed previously existing PowerPoint file.')
+                if self.incremental_update:
+                    # The existing PowerPoint is updated instead of removed, so only check it can be written to
+                    open(presentation_path, "r+b").close()
+                    pass
+                else:
+                    os.remove(presentation_path)
+                    logger.log(PPTX_INFO, f'Removed previously existing PowerPoint file.')
+                    pass
                 pass
             except PermissionError as e:
                 e.strerror = f'Currently existing PowerPoint file is protected, by the system, from ' \
@@ -592,70 +1344,314 @@ class PPTXScene(manim.ThreeDScene):
             os.mkdir(self.output_folder)
         if not os.path.exists(self.temporary_dir):
             os.mkdir(self.temporary_dir)
-        super(PPTXScene, self).render(*args, **kwargs)
+        if self.use_slide_cache and not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        manifest = None
+        if self.use_manifest:
+            manifest = BuildManifest(os.path.join(self.temporary_dir,
+                                                  os.path.splitext(presentation_name)[0] + ".manifest.sqlite"))
+            if self.reuse_slides and self.select_slides is None:
+                self.previousSlides = self.__previousSlides__(manifest, os.path.splitext(presentation_name)[0])
+                pass
+            build_id = manifest.startBuild(os.path.splitext(presentation_name)[0], self.__buildSettings__())
+            pass
+        elif self.reuse_slides:
+            logger.log(PPTX_WARNING, "The slides of the last build can't be reused without the manifest.")
+            pass
+        if self.use_checkpoint:
+            self.checkpointFile = os.path.join(self.temporary_dir,
+                                               os.path.splitext(presentation_name)[0] + ".checkpoint.json")
+            self.__loadCheckpoint__()
+            pass
+        try:
+            stage_start = time.perf_counter()
+            # The first slide is timed from the start of the construction (the others from the end of the slide before)
+            self.slideStartTime = stage_start
+            try:
+                super(PPTXScene, self).render(*args, **kwargs)
+            except BaseException:
+                self.__waitForMediaJobs__(cancel=True)
+                # Keep the slides that were finished (and combined) for the next build
+                self.__saveCheckpoint__()
+                raise
+            self.__stopResuming__()
+            self.stageTimings['scene'] = time.perf_counter() - stage_start
+            if self.previousSlides:
+                reused = sum(bool(slide_info.get('reused')) for slide_info in self.slides)
+                logger.log(PPTX_INFO, f"Reused {reused} slides of the last build, rendered the other "
+                                      f"{len(self.slides) - reused}.")
+                pass
+            stage_start = time.perf_counter()
+            self.__waitForMediaJobs__()
+            self.stageTimings['media'] = time.perf_counter() - stage_start
+            if self.select_slides is not None:
+                # The preview only has the selected slides
+                self.slides = [slide_info for slide_info in self.slides if not slide_info.get('skipped')]
+                pass
+
+            stage_start = time.perf_counter()
+            self.__writePresentation__(presentation_path)
+            self.stageTimings['pptx'] = time.perf_counter() - stage_start
+            pass
+        except BaseException:
+            if manifest is not None:
+                manifest.finishBuild(build_id, "failed", self.slides, self.stageTimings)
+                manifest.close()
+                pass
+            raise
+        if manifest is not None:
+            manifest.finishBuild(build_id, "finished", self.slides, self.stageTimings, presentation_path)
+            manifest.close()
+            pass
+        if self.checkpointFile is not None and os.path.isfile(self.checkpointFile):
+            os.remove(self.checkpointFile)
+            pass
+        pass
+
+    def __buildSettings__(self) -> dict:
+        """Settings of the build that are recorded in the manifest."""
+        settings = {key: getattr(self, key) for key in (
+            "output_folder", "temporary_dir", "cache_dir", "use_slide_cache", "media_workers", "poster_frame",
+            "poster_format", "poster_quality", "poster_scale", "static_slides_as_pictures", "native_waits",
+            "stream_media", "package_workers", "embed_media", "incremental_update", "select_slides", "reuse_slides")}
+        settings.update(pixel_width=manim.config.pixel_width, pixel_height=manim.config.pixel_height,
+                        frame_rate=manim.config.frame_rate, manim=manim.__version__)
+        return settings
+
+    def __writePresentation__(self, presentation_path: str):
+        """Write the slides to the PowerPoint (or update it, see incremental_update)."""
+        presentation_name = os.path.basename(presentation_path)
+        notes = self.__composeNotes__()
+        for tslide, slide_notes in zip(self.slides, notes):
+            tslide['fingerprint'] = self.__slideFingerprint__(tslide)
+            tslide['notes_fingerprint'] = notesFingerprint(slide_notes)
+            pass
+
+        if self.incremental_update and os.path.isfile(presentation_path):
+            try:
+                stage_start = time.perf_counter()
+                self.__updatePresentation__(presentation_path, notes)
+                self.stageTimings['update'] = time.perf_counter() - stage_start
+                return
+            except (zipfile.BadZipFile, KeyError, ValueError) as e:
+                # e.g. the PowerPoint was written by something else, or edited in a way that can't be matched up
+                logger.log(PPTX_WARNING, f"Couldn't update {presentation_name} in place ({e!r}), "
+                                         f"writing it from scratch instead.")
+                os.remove(presentation_path)
+                pass
+            pass
         logger.log(PPTX_INFO, "Creating PPTX")
 
-        # open/load-in template presentation
-        prs = pptx.Presentation(pptx=os.path.join(os.path.split(__file__)[0], "template.pptx"))
+        prs = self.__newPresentation__()
+        self.__addSlides__(prs, self.slides, notes)
+
+        # Save presentation
+        timings = savePresentation(prs, presentation_path, self.mediaPlaceholders, self.package_workers)
+        self.stageTimings.update({f'save_{phase}': timings[phase] for phase in ('package', 'compress', 'parts',
+                                                                                 'media')})
+        logger.log(PPTX_INFO, f'PowerPoint written to: {presentation_name} in {self.output_folder}')
+        if not self.embed_media:
+            logger.log(PPTX_INFO, f'{presentation_name} is a draft linking to the slide videos, run "python -m '
+                                  f'presentations.PPTXPackage finalize {presentation_path}" to embed them.')
+            pass
+        save_time = sum(timings[phase] for phase in ('package', 'compress', 'parts', 'media'))
+        logger.log(PPTX_DEBUG, f"Saving took {save_time:.3f}s: "
+                               f"{timings['package']:.3f}s building the package, "
+                               f"{timings['compress']:.3f}s deflating parts, {timings['parts']:.3f}s writing parts, "
+                               f"{timings['media']:.3f}s copying {timings['media_bytes'] / 2 ** 20:.1f} MiB of media")
+        pass
+
+    def __newPresentation__(self) -> pptx.Presentation:
+        """Open the template presentation, sized for the camera."""
+        prs = templatePresentation()
         prs.slide_width = self.camera.pixel_width * 9525  # pixels to emu
         prs.slide_height = self.camera.pixel_height * 9525
-        blank_slide_layout = prs.slide_layouts[6]
+        return prs
+
+    def __composeNotes__(self) -> List[str]:
+        """Return the speaker notes of each slide, with the next slide's notes quoted when it shows them."""
+        return composeNotes(self.slides)
 
-        for slide_index, tslide in enumerate(self.slides):
+    def __addSlides__(self, prs: pptx.Presentation, slides: List[dict], notes: List[str]):
+        blank_slide_layout = prs.slide_layouts[6]
+        for tslide, slide_notes in zip(slides, notes):
             logger.log(PPTX_DEBUG,
                        f"Add slide {tslide['number']} with animations [{tslide['start']}, {tslide['end']}]")
 
-            notes = tslide["notes"] if tslide["notes"] else ""
-            if tslide["shownextnotes"] and len(self.slides) > slide_index + 1:
-                notes += "\n" + "\n".join(list(map(
-                    lambda x: "> " + x, self.slides[slide_index + 1]["notes"].split("\n"))))
-                pass
-
             slide = prs.slides.add_slide(blank_slide_layout)
-            slide.notes_slide.notes_text_frame.text = notes
-            slide_movie_file = tslide['slide_movie_file']
-            thumbnail_file = tslide['thumbnail_file']
-            logger.log(PPTX_DEBUG, f"adding animation {slide_movie_file}")
-            clip = slide.shapes.add_movie(slide_movie_file, 0, 0, prs.slide_width, prs.slide_height,
-                                          mime_type='video/mp4', poster_frame_image=thumbnail_file)
-            image_dict = {
-                "id": clip.element[0][0].attrib.get("id"),
-                "dur": PPTXScene.get_dur(slide_movie_file),
-            }
-            if tslide["autonext"]:
-                self.addAutoNext(slide)
-                outerchildTnLst = slide.element[3][0][0][0][0]
+            # The name identifies the slide (and what it was made from) when the PowerPoint is updated
+            slide.element.cSld.set("name", self.__slideIdentity__(tslide))
+            slide.notes_slide.notes_text_frame.text = slide_notes
+            if tslide['slide_movie_file'] is None:
+                self.addSlidePicture(prs, slide, tslide)
                 pass
             else:
-                outerchildTnLst = slide.element[2][0][0][0][0]
+                self.addSlideMovie(prs, slide, tslide)
                 pass
+            pass
+        pass
 
-            # Need to figure out what cTn means (or possibly childTn)
+    def __updatePresentation__(self, presentation_path: str, notes: List[str]):
+        """Replace the slides of the existing PowerPoint that changed, and add, remove, or move the others."""
+        start = time.perf_counter()
+        with DeckEditor(presentation_path) as deck:
+            existing_slides = deck.slides()
+            # slide identity -> parts of the existing slides with that identity, with and without the notes
+            existing_parts = dict()
+            existing_content = dict()
+            for slide_part, identity in existing_slides:
+                existing_parts.setdefault(identity, list()).append(slide_part)
+                existing_content.setdefault(identity.rsplit("#", 1)[0], list()).append(slide_part)
+                pass
+            used_parts = set()
 
-            # No idea what this section is doing...
-            #   I think this has something to do with storing the animation sequence
-            seq = etree.Element(url_schema + "seq", concurrent="1", nextAc="seek")
-            outerchildTnLst.insert(0, seq)
-            cTnIDCounter = itertools.count(2)  # Some sort of counter
-            childTnLst = self.addCTn(cTnIDCounter, tslide, [image_dict], seq)
-            self.addPrevCondLst(seq)  # Allows individual animation slide to be reviewed without automatically advancing
-            self.addNextCondLst(seq)  # remove necessity for trigger for videos (animations)
+            def claim(candidates: List[str]):
+                for candidate in candidates:
+                    if candidate not in used_parts:
+                        used_parts.add(candidate)
+                        return candidate
+                    pass
+                return None
+
+            slide_parts = [claim(existing_parts.get(self.__slideIdentity__(tslide), [])) for tslide in self.slides]
+            changed = list()
+            renoted = list()
+            for slide_index, tslide in enumerate(self.slides):
+                if slide_parts[slide_index] is not None:
+                    continue
+                slide_parts[slide_index] = claim(existing_content.get(self.__slideIdentity__(tslide, False), []))
+                if slide_parts[slide_index] is None:
+                    changed.append(slide_index)
+                    pass
+                else:
+                    # Only the notes changed, so only they are replaced
+                    deck.setNotes(slide_parts[slide_index], notes[slide_index])
+                    deck.setSlideName(slide_parts[slide_index], self.__slideIdentity__(tslide))
+                    renoted.append(slide_index)
+                    pass
+                pass
+            if not changed and not renoted and slide_parts == [slide_part for slide_part, _ in existing_slides]:
+                logger.log(PPTX_INFO, f'PowerPoint {os.path.basename(presentation_path)} is already up to date.')
+                return
+
+            if changed:
+                # Write the new slides in a presentation of their own, and copy them over
+                prs = self.__newPresentation__()
+                self.__addSlides__(prs, [self.slides[i] for i in changed], [notes[i] for i in changed])
+                package = io.BytesIO()
+                prs.save(package)
+                with zipfile.ZipFile(package) as scratch:
+                    for slide_index, slide_part in zip(changed, deck.insertSlides(scratch, self.mediaPlaceholders)):
+                        slide_parts[slide_index] = slide_part
+                        pass
+                    pass
+                pass
+            deck.setSlideSize(self.camera.pixel_width * 9525, self.camera.pixel_height * 9525)
+            deck.setSlides(slide_parts)
+            pass
+        removed = len(existing_slides) - (len(self.slides) - len(changed))
+        logger.log(PPTX_INFO, f'PowerPoint updated: {os.path.basename(presentation_path)} in {self.output_folder} '
+                              f'({len(changed)} slides written, {len(renoted)} with new notes, {removed} removed, '
+                              f'{len(self.slides) - len(changed) - len(renoted)} kept) '
+                              f'in {time.perf_counter() - start:.3f}s')
+        pass
 
-            # Add effect to play the animation, starting immediately
-            currentdelay = 0
-            self.playEffect(cTnIDCounter, currentdelay, image_dict, childTnLst)
+    @staticmethod
+    def __slideIdentity__(tslide: dict, with_notes=True) -> str:
+        """Name, fingerprint, and notes fingerprint of a slide, which are stored as the name of the slide."""
+        identity = f"{tslide['name']}#{tslide['fingerprint']}"
+        return f"{identity}#{tslide['notes_fingerprint']}" if with_notes else identity
+
+    def __slideFingerprint__(self, tslide: dict) -> str:
+        """Fingerprint what the slide in the PowerPoint is made from (except its notes), to tell when it changed."""
+        fingerprint = hashlib.sha256(repr((
+            slide_format_version, self.embed_media, self.camera.pixel_width, self.camera.pixel_height,
+            [tslide.get(key) for key in ('type', 'autonext', 'duration', 'waits', 'static')],
+            [self.__fileIdentity__(tslide[key]) for key in ('slide_movie_file', 'thumbnail_file')],
+        )).encode())
+        return fingerprint.hexdigest()[:16]
+
+    def __fileIdentity__(self, filename: str):
+        if filename is None:
+            return None
+        if self.use_slide_cache and os.path.abspath(filename).startswith(os.path.abspath(self.cache_dir)):
+            # files in the cache are named after their content
+            return os.path.basename(filename)
+        stat = os.stat(filename)
+        return os.path.basename(filename), stat.st_size, stat.st_mtime_ns
+
+    def addSlideMovie(self, prs: pptx.Presentation, slide: pptx.slide.Slide, tslide: dict):
+        """Add the combined video of a slide, with the timing to play it as soon as the slide starts."""
+        slide_movie_file = tslide['slide_movie_file']
+        thumbnail_file = tslide['thumbnail_file']
+        logger.log(PPTX_DEBUG, f"adding animation {slide_movie_file}")
+        if self.stream_media or not self.embed_media:
+            movie = self.mediaPlaceholders.placeholder(slide_movie_file)
+            pass
+        else:
+            movie = slide_movie_file
+            pass
+        clip = slide.shapes.add_movie(movie, 0, 0, prs.slide_width, prs.slide_height,
+                                      mime_type='video/mp4', poster_frame_image=thumbnail_file)
+        if not self.embed_media:
+            linkMovie(clip, slide_movie_file)
+            pass
+        # durations are known from the frames manim wrote, unless a wait had a stop condition
+        video_duration = tslide['duration'] if tslide.get('duration') is not None else self.get_dur(slide_movie_file)
+        # Native waits before the video delay it, waits during the video pause it, and waits after it hold the slide
+        waits = tslide.get('waits', [])
+        leading_wait = sum(wait for offset, wait in waits if offset == 0)
+        pauses = [(offset, wait) for offset, wait in waits if 0 < offset < video_duration]
+        trailing_wait = sum(wait for offset, wait in waits if 0 < offset and video_duration <= offset)
+        image_dict = {
+            "id": clip.element[0][0].attrib.get("id"),
+            "dur": video_duration + sum(wait for offset, wait in pauses) + trailing_wait,
+        }
+        if tslide["autonext"]:
+            self.addAutoNext(slide)
+            outerchildTnLst = slide.element[3][0][0][0][0]
+            pass
+        else:
+            outerchildTnLst = slide.element[2][0][0][0][0]
+            pass
 
-            # No idea what this part is doing...
-            #   I think this makes it so the slide show goes smoothly onto the end-show slide (and possibly others)
-            for i in range(1, len(outerchildTnLst)):
-                outerchildTnLst[i][0][0].attrib["id"] = str(next(cTnIDCounter))
-                pass
+        # Need to figure out what cTn means (or possibly childTn)
+
+        # No idea what this section is doing...
+        #   I think this has something to do with storing the animation sequence
+        seq = etree.Element(url_schema + "seq", concurrent="1", nextAc="seek")
+        outerchildTnLst.insert(0, seq)
+        cTnIDCounter = itertools.count(2)  # Some sort of counter
+        childTnLst = self.addCTn(cTnIDCounter, tslide, [image_dict], seq)
+        self.addPrevCondLst(seq)  # Allows individual animation slide to be reviewed without automatically advancing
+        self.addNextCondLst(seq)  # remove necessity for trigger for videos (animations)
+
+        # Add effect to play the animation, starting immediately (or after the waits at the start of the slide)
+        currentdelay = leading_wait
+        self.playEffect(cTnIDCounter, currentdelay, image_dict, childTnLst)
+        for offset, wait in pauses:
+            # pause the video when it gets to the wait, and continue once the wait is over
+            self.togglePauseEffect(cTnIDCounter, currentdelay + offset, image_dict, childTnLst)
+            currentdelay += wait
+            self.togglePauseEffect(cTnIDCounter, currentdelay + offset, image_dict, childTnLst)
             pass
 
-        # Save presentation
-        prs.save(presentation_path)
-        logger.log(PPTX_INFO, f'PowerPoint written to: {presentation_name} in {self.output_folder}')
-        # print(self.renderer.file_writer.partial_movie_directory)
+        # No idea what this part is doing...
+        #   I think this makes it so the slide show goes smoothly onto the end-show slide (and possibly others)
+        for i in range(1, len(outerchildTnLst)):
+            outerchildTnLst[i][0][0].attrib["id"] = str(next(cTnIDCounter))
+            pass
+        pass
+
+    def addSlidePicture(self, prs: pptx.Presentation, slide: pptx.slide.Slide, tslide: dict):
+        """Add the picture of a static slide, which doesn't need a video or any media timing."""
+        logger.log(PPTX_DEBUG, f"adding picture {tslide['thumbnail_file']}")
+        slide.shapes.add_picture(tslide['thumbnail_file'], 0, 0, prs.slide_width, prs.slide_height)
+        if tslide["autonext"]:
+            # There are no animations to wait for, so the slide advances after its waits
+            self.addAutoNext(slide, (tslide.get('duration') or 0) + sum(wait for _, wait in tslide.get('waits', [])))
+            pass
         pass
 
     # static methods for controlling slide animations, transitions, and other components.
@@ -664,10 +1660,10 @@ class PPTXScene(manim.ThreeDScene):
     # TODO (2023-03-06 @ 10:30:19): Convert these to a class of their own (this should make it more object oriented)
 
     @staticmethod
-    def addAutoNext(slide: pptx.slide.Slide):
+    def addAutoNext(slide: pptx.slide.Slide, advance_time: int = 0):
         transition = etree.Element(url_schema + "transition", {
             "spd": "slow",
-            "advTm": "0",
+            "advTm": str(advance_time),  # milliseconds after the slide's animations are done
         })
         slide.element.insert(2, transition)
         pass
@@ -898,6 +1894,49 @@ class PPTXScene(manim.ThreeDScene):
         childTnLst.append(par)
         pass
 
+    @staticmethod
+    def togglePauseEffect(
+            cTnIDCounter: itertools.count, currentdelay: int, image_dict: dict,
+            childTnLst: etreeElementClass):
+        par = etree.Element(url_schema + "par")
+        cTn = etree.Element(url_schema + "cTn", id=str(next(cTnIDCounter)), fill="hold")
+        stCondLst = etree.Element(url_schema + "stCondLst")
+        cond = etree.Element(url_schema + "cond", delay=str(currentdelay))
+        stCondLst.append(cond)
+        cTn.append(stCondLst)
+
+        innerchildTnLst = etree.Element(url_schema + "childTnLst")
+        innerPar = etree.Element(url_schema + "par")
+        innercTn = etree.Element(url_schema + "cTn", id=str(next(cTnIDCounter)), presetID="2", presetClass="mediacall",
+                                 presetSubtype="0", fill="hold", nodeType="afterEffect")
+        innerstCondLst = etree.Element(url_schema + "stCondLst")
+        innercond = etree.Element(url_schema + "cond", delay="0")
+        innerstCondLst.append(innercond)
+        innercTn.append(innerstCondLst)
+
+        innerInnerChildTnLst = etree.Element(url_schema + "childTnLst")
+        innercTn.append(innerInnerChildTnLst)
+
+        cmd = etree.Element(url_schema + "cmd", type="call", cmd="togglePause")
+        cBhvr = etree.Element(url_schema + "cBhvr")
+        cBhvrcTn = etree.Element(url_schema + "cTn", id=str(next(cTnIDCounter)), dur="1", fill="hold")
+        cBhvr.append(cBhvrcTn)
+        tgtEl = etree.Element(url_schema + "tgtEl")
+        spTgt = etree.Element(url_schema + "spTgt", spid=str(image_dict["id"]))
+        tgtEl.append(spTgt)
+        cBhvr.append(tgtEl)
+        cmd.append(cBhvr)
+
+        innerInnerChildTnLst.append(cmd)
+
+        innerPar.append(innercTn)
+        innerchildTnLst.append(innerPar)
+        cTn.append(innerchildTnLst)
+
+        par.append(cTn)
+        childTnLst.append(par)
+        pass
+
     pass
 
 
@@ -0,0 +1,276 @@
+__all__ = [
+    "loadPresentation",
+    "presentationTopics",
+    "buildTopic",
+    "buildTopics",
+]
+
+# Command to build a Topic (or only some of its slides) without the manim command, e.g. to check a single slide:
+#       python -m presentations.PresentationBuild intro_presentation.py T02_Philosophy --slides "Circle*" -q l
+#   which writes pptx/T02_Philosophy_preview.pptx with the selected slides (and their child slides), fast-forwarding
+#   through the slides before them.  The same selection can be made for the manim command with the
+#   PRESENTATIONS_SLIDES environment variable (see PPTXScene's select_slides).
+#   Given more than one Topic (or none, for all of them), the Topics are built in a pool of processes, and their
+#   PowerPoints can be merged into one (like "All" does) with --merge:
+#       python -m presentations.PresentationBuild intro_presentation.py -j 6 --merge
+#   The slides of a long Topic can be rendered in a pool of processes as well (see Topic's parallel_slides):
+#       python -m presentations.PresentationBuild intro_presentation.py T03_Tensors --parallel-slides 8
+#   or by workers on other machines, through a queue in a directory they share (see PresentationQueue):
+#       python -m presentations.PresentationBuild intro_presentation.py --queue /shared/queue --merge
+#   After editing a few slides, only those (and the slides that start where they end) have to be rendered again, the
+#   others are reused from the last build (see PPTXScene's reuse_slides, and PresentationWatch to do it on every save):
+#       python -m presentations.PresentationBuild intro_presentation.py T02_Philosophy --reuse --incremental
+
+if __name__ == '__main__':
+    __package__ = "presentations"
+    pass
+
+import os
+import sys
+import time
+import argparse
+import importlib.util
+import concurrent.futures
+import types
+import typing
+import manim
+from .PresentationLogger import logger, TOPIC_INFO, TOPIC_WARNING
+from .PresentationTopics import Topic
+from .PPTXPackage import mergePresentations
+from .PresentationQueue import BuildQueue
+from .PresentationSchedule import longestFirst, scheduleReport, topicSeconds
+
+# manim's quality flags (as in "manim -ql") -> quality names
+quality_flags = {quality["flag"]: name for name, quality in manim.constants.QUALITIES.items() if quality["flag"]}
+
+
+def loadPresentation(filename: str) -> types.ModuleType:
+    """Import the python file a presentation's Topics are defined in."""
+    module_name = os.path.splitext(os.path.basename(filename))[0]
+    module = sys.modules.get(module_name)
+    if module is not None and os.path.abspath(getattr(module, "__file__", "")) == os.path.abspath(filename):
+        # Importing it again would define its Topics again (see Topic.__subclasses__), e.g. in forked processes
+        return module
+    # The presentation can import modules next to it, like it can when manim renders it
+    sys.path.insert(0, os.path.dirname(os.path.abspath(filename)))
+    spec = importlib.util.spec_from_file_location(module_name, filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def buildTopic(filename: str, topic: str, quality: str = None, **scene_kwargs) -> manim.Scene:
+    """
+    Render the Topic defined in filename (like "manim -q<quality> <filename> <topic>"), with the keyword arguments of
+    PPTXScene in scene_kwargs (e.g. select_slides), and return it.
+    """
+    module = loadPresentation(filename)
+    if not hasattr(module, topic):
+        raise ValueError(f"Topic {topic!r} isn't defined in {filename}.")
+    config = dict(input_file=filename)
+    if quality is not None:
+        config["quality"] = quality_flags.get(quality, quality)
+        pass
+    with manim.tempconfig(config):
+        scene = getattr(module, topic)(**scene_kwargs)
+        scene.render()
+        pass
+    return scene
+
+
+def presentationTopics(module: types.ModuleType) -> typing.List[typing.Type[Topic]]:
+    """Topics defined in a presentation, in order (except "All")."""
+    return [topic for topic in Topic.__subclasses__() if topic.__module__ == module.__name__ and
+            topic.__name__ != "All"]
+
+
+def buildTopics(filename: str, topics: typing.List[str] = None, workers: int = None, quality: str = None,
+                merge: bool = False, queue: str = None, **scene_kwargs) -> typing.Dict[str, dict]:
+    """
+    Render the Topics defined in filename (all of them by default) in a pool of workers processes, or by the workers
+    of the queue directory (see PresentationQueue, workers is then only the number of them the schedule is estimated
+    with), and merge their PowerPoints into "<output_folder>/<filename>.pptx" when merge is set.
+
+    Topics that inherit the end state of the Topic before them (see Topic._inherit_end_state_) are built after it in
+    the same process, the others are independent.  "All" among topics builds all of them and merges them, like "All"
+    does.  Returns the PowerPoint, the number of slides, and the time taken for each Topic.
+    """
+    module = loadPresentation(filename)
+    module_topics = presentationTopics(module)
+    if topics and "All" in topics:
+        topics = None
+        merge = True
+        pass
+    if topics:
+        unknown = set(topics) - {topic.__name__ for topic in module_topics}
+        if unknown:
+            raise ValueError(f"Topics {sorted(unknown)} aren't defined in {filename}.")
+        module_topics = [topic for topic in module_topics if topic.__name__ in topics]
+        pass
+    chains = list()
+    for topic in module_topics:
+        subclasses = Topic.__subclasses__()
+        # The first Topic has no Topic before it to inherit the end state of
+        previous_topic = subclasses[subclasses.index(topic) - 1] if subclasses.index(topic) > 0 else None
+        if topic._inherit_end_state_ and chains and previous_topic is not None and \
+                chains[-1][-1] == previous_topic.__name__:
+            chains[-1].append(topic.__name__)
+            pass
+        else:
+            chains.append([topic.__name__])
+            pass
+        pass
+    workers = workers or min(len(chains), os.cpu_count() or 1)
+    # The chains that took the longest to build last time are started first (see PresentationSchedule)
+    temporary_dir = scene_kwargs.get("temporary_dir", "./temp/")
+    suffix = "" if not scene_kwargs.get("select_slides") else "_preview"
+    chain_seconds = dict()
+    for chain in chains:
+        seconds = [topicSeconds(temporary_dir, topic + suffix) for topic in chain]
+        chain_seconds[", ".join(chain)] = None if None in seconds else sum(seconds)
+        pass
+    logger.log(TOPIC_INFO, scheduleReport(f"Topics of {filename}", chain_seconds, workers))
+    chains = [chain.split(", ") for chain in longestFirst(chain_seconds)]
+    if queue is not None:
+        results = queueChains(filename, chains, quality, queue, scene_kwargs)
+        pass
+    else:
+        results = poolChains(filename, chains, workers, quality, scene_kwargs)
+        pass
+
+    if merge:
+        presentation_name = os.path.splitext(os.path.basename(filename))[0] + \
+                            ("" if not scene_kwargs.get("select_slides") else "_preview")
+        merged_file = os.path.join(scene_kwargs.get("output_folder", "./pptx/"), presentation_name + ".pptx")
+        slide_count = mergePresentations(merged_file, [(topic.__name__, results[topic.__name__]["pptx"])
+                                                       for topic in module_topics])
+        logger.log(TOPIC_INFO, f"Merged {slide_count} slides into {merged_file}.")
+        pass
+    return results
+
+
+def poolChains(filename: str, chains: typing.List[typing.List[str]], workers: int, quality: str,
+               scene_kwargs: dict) -> typing.Dict[str, dict]:
+    """Build the chains of Topics (in the order they're started in) in a pool of workers processes."""
+    # The slides of each Topic are combined by threads of their own (see PPTXScene's media_workers), which shouldn't
+    # add up to more than there are cores
+    scene_kwargs = dict(scene_kwargs)
+    scene_kwargs.setdefault("media_workers", max(1, (os.cpu_count() or 1) // workers))
+
+    logger.log(TOPIC_INFO, f"Building {sum(map(len, chains))} Topics of {filename} in {workers} processes.")
+    results = dict()
+    failures = dict()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = {pool.submit(buildChain, filename, chain, quality, scene_kwargs): chain for chain in chains}
+        for job in concurrent.futures.as_completed(jobs):
+            try:
+                results.update(job.result())
+                pass
+            except Exception as e:
+                logger.log(TOPIC_WARNING, f"Building {', '.join(jobs[job])} failed: {e!r}")
+                failures[", ".join(jobs[job])] = e
+                pass
+            pass
+        pass
+    if failures:
+        raise RuntimeError(f"Building {'; '.join(failures)} of {filename} failed.") from next(iter(failures.values()))
+    return results
+
+
+def queueChains(filename: str, chains: typing.List[typing.List[str]], quality: str, queue: str,
+                scene_kwargs: dict) -> typing.Dict[str, dict]:
+    """Build the chains of Topics (in the order they're claimed in) by the workers of the queue directory."""
+    build_queue = BuildQueue(queue)
+    # The workers load the presentation, and write the PowerPoints, at the same (absolute) paths
+    scene_kwargs = dict(scene_kwargs, output_folder=os.path.join(
+        os.path.abspath(scene_kwargs.get("output_folder", "./pptx/")), ""))
+    jobs = {build_queue.submit("topics", presentation=os.path.abspath(filename), topics=chain, quality=quality,
+                               scene_kwargs=scene_kwargs): chain for chain in chains}
+    logger.log(TOPIC_INFO, f"Queued {sum(map(len, chains))} Topics of {filename}, waiting for the workers of "
+                           f"{build_queue.directory} (python -m presentations.PresentationQueue "
+                           f"{build_queue.directory}).")
+    results = dict()
+    failures = dict()
+    for job_id, result in build_queue.wait(jobs):
+        if result["error"] is not None:
+            logger.log(TOPIC_WARNING, f"Building {', '.join(jobs[job_id])} failed:\n{result['error']}")
+            failures[", ".join(jobs[job_id])] = result["error"]
+            pass
+        else:
+            results.update(result["result"])
+            pass
+        pass
+    if failures:
+        raise RuntimeError(f"Building {'; '.join(failures)} of {filename} failed:\n{next(iter(failures.values()))}")
+    return results
+
+
+def buildChain(filename: str, topics: typing.List[str], quality: str, scene_kwargs: dict) -> typing.Dict[str, dict]:
+    """Build topics in turn (in a process of the pool of buildTopics)."""
+    results = dict()
+    # Tex is compiled in a folder of each chain, so two processes don't compile the same Tex in the same place
+    with manim.tempconfig(dict(tex_dir=os.path.join(manim.config.get_dir("tex_dir"), topics[0]))):
+        for topic in topics:
+            start = time.perf_counter()
+            scene = buildTopic(filename, topic, quality, **scene_kwargs)
+            results[topic] = dict(pptx=os.path.join(scene.output_folder, scene.__presentationName__() + ".pptx"),
+                                  slides=len(scene.slides), seconds=time.perf_counter() - start)
+            pass
+        pass
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PresentationBuild",
+                                     description="Build the PowerPoints of Topics, or previews of only some of their "
+                                                 "slides.")
+    parser.add_argument("presentation", help="python file the Topics are defined in")
+    parser.add_argument("topics", nargs="*",
+                        help="names of the Topics to build (or All, to build all of them and merge them), all of them "
+                             "by default")
+    parser.add_argument("--slides", default=None,
+                        help='patterns of the slides to build, comma separated, e.g. "T02_Philosophy.Circle*" '
+                             '(child slides of the matching slides are built too)')
+    parser.add_argument("-q", "--quality", choices=list(quality_flags), default=None,
+                        help="render quality, as in manim's -q option")
+    parser.add_argument("--output-folder", default="./pptx/", help="folder to write the PowerPoint to")
+    parser.add_argument("--incremental", action="store_true",
+                        help="update the existing PowerPoint in place (see PPTXScene's incremental_update)")
+    parser.add_argument("--reuse", action="store_true",
+                        help="reuse the slides of the last build that didn't change, only rendering the others (see "
+                             "PPTXScene's reuse_slides)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="processes building Topics at the same time (one per Topic, up to the number of cores, "
+                             "by default)")
+    parser.add_argument("--merge", action="store_true", help="merge the PowerPoints of the Topics into one")
+    parser.add_argument("--queue", default=None,
+                        help="directory shared with the machines building the Topics, instead of building them here "
+                             "(see PresentationQueue)")
+    parser.add_argument("--parallel-slides", type=int, default=0,
+                        help="processes rendering the slides of each Topic at the same time (see Topic's "
+                             "parallel_slides), 0 to render them in turn")
+    arguments = parser.parse_args()
+    start = time.perf_counter()
+    build_kwargs = dict(output_folder=arguments.output_folder, incremental_update=arguments.incremental,
+                        reuse_slides=arguments.reuse, parallel_slides=arguments.parallel_slides)
+    if arguments.slides is not None:
+        build_kwargs["select_slides"] = arguments.slides
+        pass
+    if len(arguments.topics) == 1 and arguments.topics != ["All"] and arguments.workers is None and \
+            not arguments.merge and arguments.queue is None:
+        built_scene = buildTopic(arguments.presentation, arguments.topics[0], arguments.quality, **build_kwargs)
+        logger.log(TOPIC_INFO, f"Built {built_scene.__presentationName__()}.pptx ({len(built_scene.slides)} slides) "
+                               f"in {time.perf_counter() - start:.1f}s")
+        pass
+    else:
+        built_topics = buildTopics(arguments.presentation, arguments.topics, arguments.workers, arguments.quality,
+                                   arguments.merge, arguments.queue, **build_kwargs)
+        for topic_name, built in built_topics.items():
+            logger.log(TOPIC_INFO, f"Built {os.path.basename(built['pptx'])} ({built['slides']} slides) in "
+                                   f"{built['seconds']:.1f}s")
+            pass
+        logger.log(TOPIC_INFO, f"Built {len(built_topics)} Topics in {time.perf_counter() - start:.1f}s "
+                               f"({sum(built['seconds'] for built in built_topics.values()):.1f}s one after another)")
+        pass
+    pass
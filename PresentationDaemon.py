@@ -0,0 +1,292 @@
+__all__ = [
+    "serve",
+    "requestBuild",
+    "default_socket",
+]
+
+# Daemon that keeps manim, python-pptx, lxml, the Topics, and the parsed template imported (and warm) between builds,
+#   so building a small Topic takes as long as rendering it rather than starting python and importing all of them:
+#       python -m presentations.PresentationDaemon serve &
+#       python -m presentations.PresentationDaemon build intro_presentation.py T02_Philosophy -q l
+#   The daemon listens on a Unix socket, and forks a process for each build, which loads the presentation (the only
+#   module that's imported again) in the working directory of the request, so the builds don't leave any state behind
+#   in the daemon, like Topics that were defined again (manim's config is read again there as well, with the manim.cfg
+#   of that directory).  The build command takes the options of PresentationBuild, and only imports what it needs to
+#   send the request, so it starts right away.  The daemon runs the presentations it's asked to as the user who
+#   started it, so only that user can connect to its socket (which is in $XDG_RUNTIME_DIR when it's set).
+
+if __name__ == '__main__':
+    __package__ = "presentations"
+    pass
+
+import os
+import sys
+import json
+import time
+import stat
+import signal
+import socket
+import logging
+import argparse
+import tempfile
+import traceback
+import typing
+
+# Socket the daemon listens on by default, one for each user (in the user's own runtime directory when there is one)
+default_socket = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+                              f"presentations-{os.getuid()}.sock")
+
+
+def preload():
+    """Import (and parse) what every build needs, so the builds forked from the daemon start with it."""
+    import manim
+    from . import PresentationTopics, PresentationBuild
+    from .PPTXScene import templatePresentation
+    templatePresentation()
+    # The default Tex template is read from manim's files the first time it's used
+    getattr(manim.config, "tex_template", None)
+    pass
+
+
+def serve(socket_path: str = default_socket):
+    """Serve build requests on the Unix socket socket_path, forking a process for each one, until interrupted."""
+    preload()
+    from .PresentationLogger import logger, TOPIC_INFO
+    if os.path.exists(socket_path):
+        checkSocketOwner(socket_path)
+        try:
+            # Refuse to take over the socket of a daemon that's still running
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+                pass
+            raise RuntimeError(f"A daemon is already listening on {socket_path}.")
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+            pass
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Only the user running the daemon can connect to it, since it runs whatever the requests ask for
+    umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+        pass
+    finally:
+        os.umask(umask)
+        pass
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    # Builds that finish are reaped between requests
+    server.settimeout(1.0)
+    # Stopping the daemon (e.g. with kill) removes its socket as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.log(TOPIC_INFO, f"Serving builds on {socket_path} (pid {os.getpid()}).")
+    try:
+        while True:
+            reapBuilds()
+            try:
+                connection, _ = server.accept()
+                pass
+            except socket.timeout:
+                continue
+            if os.fork() == 0:
+                server.close()
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                status = 1
+                try:
+                    with connection:
+                        connection.settimeout(None)
+                        status = handleRequest(connection)
+                        pass
+                    pass
+                finally:
+                    # Only the build's process exits, without the daemon's cleanup (e.g. removing the socket)
+                    os._exit(status)
+                pass
+            connection.close()
+            pass
+        pass
+    finally:
+        server.close()
+        os.remove(socket_path)
+        pass
+    pass
+
+
+def checkSocketOwner(socket_path: str):
+    """Refuse to use socket_path unless it's a socket of the current user (e.g. one put there by another user)."""
+    status = os.lstat(socket_path)
+    if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid():
+        raise RuntimeError(f"{socket_path} isn't a socket of the current user, refusing to use it.")
+    pass
+
+
+def loadConfig():
+    """Read manim's config again in the working directory of the build, so the manim.cfg there is used."""
+    import manim
+    from manim._config.utils import make_config_parser
+    manim.config.digest_parser(make_config_parser())
+    pass
+
+
+def reapBuilds():
+    """Collect the exit status of the builds that finished, so they don't linger."""
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            pass
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        pass
+    pass
+
+
+class ConnectionHandler(logging.Handler):
+    """Send the log records of a build to the client that requested it."""
+
+    def __init__(self, connection: socket.socket):
+        super(ConnectionHandler, self).__init__()
+        self.connection = connection
+        self.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        pass
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            sendMessage(self.connection, dict(log=self.format(record)))
+            pass
+        except OSError:
+            # The client went away, the build carries on
+            pass
+        pass
+
+    pass
+
+
+def handleRequest(connection: socket.socket) -> int:
+    """Build what the request on connection asks for (in the process forked for it), and send back the result."""
+    from .PresentationLogger import logger
+    from .PresentationBuild import buildTopic, buildTopics
+    request = receiveMessage(connection.makefile("r", encoding="utf-8"))
+    start = time.perf_counter()
+    logger.addHandler(ConnectionHandler(connection))
+    try:
+        os.chdir(request["cwd"])
+        loadConfig()
+        topics = request.get("topics") or []
+        build_kwargs = request.get("build_kwargs", {})
+        if len(topics) == 1 and topics != ["All"] and request.get("workers") is None and not request.get("merge") and \
+                request.get("queue") is None:
+            scene = buildTopic(request["presentation"], topics[0], request.get("quality"), **build_kwargs)
+            results = {topics[0]: dict(pptx=os.path.join(scene.output_folder, scene.__presentationName__() + ".pptx"),
+                                       slides=len(scene.slides), seconds=time.perf_counter() - start)}
+            pass
+        else:
+            results = buildTopics(request["presentation"], topics, request.get("workers"), request.get("quality"),
+                                  request.get("merge", False), request.get("queue"), **build_kwargs)
+            pass
+        sendMessage(connection, dict(results=results, seconds=time.perf_counter() - start))
+        return 0
+    except BaseException:
+        sendMessage(connection, dict(error=traceback.format_exc(), seconds=time.perf_counter() - start))
+        return 1
+    pass
+
+
+def sendMessage(connection: socket.socket, message: dict):
+    connection.sendall((json.dumps(message, default=str) + "\n").encode("utf-8"))
+    pass
+
+
+def receiveMessage(file: typing.TextIO) -> typing.Optional[dict]:
+    line = file.readline()
+    return json.loads(line) if line else None
+
+
+def requestBuild(presentation: str, topics: typing.List[str] = (), quality: str = None, workers: int = None,
+                 merge: bool = False, queue: str = None, socket_path: str = default_socket,
+                 log: typing.Callable[[str], None] = None, **build_kwargs) -> typing.Dict[str, dict]:
+    """
+    Ask the daemon on socket_path to build the Topics of presentation (like PresentationBuild does, with the keyword
+    arguments of the Topics in build_kwargs), passing its log messages to log, and return the results.
+    """
+    request = dict(presentation=os.path.abspath(presentation), topics=list(topics), quality=quality,
+                   workers=workers, merge=merge, queue=queue, build_kwargs=build_kwargs, cwd=os.getcwd())
+    if os.path.exists(socket_path):
+        # Another user could have put a socket there to answer the requests
+        checkSocketOwner(socket_path)
+        pass
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(socket_path)
+            pass
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ConnectionError(f"No daemon is listening on {socket_path}, start one with "
+                                  f"\"python -m presentations.PresentationDaemon serve\".") from e
+        sendMessage(connection, request)
+        with connection.makefile("r", encoding="utf-8") as file:
+            while True:
+                message = receiveMessage(file)
+                if message is None:
+                    raise ConnectionError(f"The daemon on {socket_path} stopped before the build finished.")
+                elif "log" in message:
+                    if log is not None:
+                        log(message["log"])
+                        pass
+                    pass
+                elif "error" in message:
+                    raise RuntimeError(f"Building {presentation} failed in the daemon:\n{message['error']}")
+                else:
+                    return message["results"]
+                pass
+            pass
+        pass
+    pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PresentationDaemon",
+                                     description="Build Topics in a daemon that keeps manim and the rest imported.")
+    parser.add_argument("--socket", default=default_socket, help="Unix socket of the daemon")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("serve", help="start the daemon")
+    build_parser = commands.add_parser("build", help="build Topics in the daemon (see PresentationBuild)")
+    build_parser.add_argument("presentation", help="python file the Topics are defined in")
+    build_parser.add_argument("topics", nargs="*", help="names of the Topics to build, all of them by default")
+    build_parser.add_argument("--slides", default=None, help="patterns of the slides to build, comma separated")
+    build_parser.add_argument("-q", "--quality", default=None, help="render quality, as in manim's -q option")
+    build_parser.add_argument("--output-folder", default="./pptx/", help="folder to write the PowerPoint to")
+    build_parser.add_argument("--incremental", action="store_true", help="update the existing PowerPoint in place")
+    build_parser.add_argument("--reuse", action="store_true",
+                              help="reuse the slides of the last build that didn't change")
+    build_parser.add_argument("-j", "--workers", type=int, default=None, help="processes building Topics at once")
+    build_parser.add_argument("--merge", action="store_true", help="merge the PowerPoints of the Topics into one")
+    build_parser.add_argument("--queue", default=None, help="directory of the queue the Topics are built through")
+    build_parser.add_argument("--parallel-slides", type=int, default=0,
+                              help="processes rendering the slides of each Topic at once")
+    arguments = parser.parse_args()
+    if arguments.command == "serve":
+        serve(arguments.socket)
+        pass
+    else:
+        build_start = time.perf_counter()
+        build_kwargs = dict(output_folder=arguments.output_folder, incremental_update=arguments.incremental,
+                            reuse_slides=arguments.reuse, parallel_slides=arguments.parallel_slides)
+        if arguments.slides is not None:
+            build_kwargs["select_slides"] = arguments.slides
+            pass
+        try:
+            built_topics = requestBuild(arguments.presentation, arguments.topics, arguments.quality, arguments.workers,
+                                        arguments.merge, arguments.queue, arguments.socket,
+                                        log=lambda line: print(line, file=sys.stderr), **build_kwargs)
+            pass
+        except (ConnectionError, RuntimeError) as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        for topic_name, built in built_topics.items():
+            print(f"Built {os.path.basename(built['pptx'])} ({built['slides']} slides) in {built['seconds']:.1f}s",
+                  file=sys.stdout)
+            pass
+        print(f"Done in {time.perf_counter() - build_start:.1f}s", file=sys.stdout)
+        pass
+    pass
@@ -0,0 +1,161 @@
+__all__ = [
+    "AttributeTrace",
+    "traceAttributes",
+    "loadDependencies",
+    "saveDependencies",
+]
+
+# Dependencies of a Topic on the setups of the Topics before it (see Topic.__setup_dependencies__).
+#   While a Topic is built, every attribute of it that's written or read is traced, along with the setup (or the Topic
+#   itself) that was running at the time.  A setup is needed by the Topic when the Topic reads an attribute the setup
+#   wrote (or read, since it could have changed the mobject it read), directly or through other setups.  The result
+#   is saved next to the temporary files, and the following builds skip the dependency setups the Topic doesn't need
+#   until the code of any of the Topics changes, when it's traced again.
+#   Only attributes are traced, so setups that are needed for something else (e.g. changing the config) should be in
+#   the Topic's own setup, or inference turned off with infer_dependencies=False.
+
+import os
+import json
+import contextlib
+import typing
+
+
+class AttributeTrace:
+    """Record of which phases (e.g. setups) of a build read the attributes which other phases wrote."""
+
+    def __init__(self):
+        self.phase = None
+        # Phases that are setups, which may change what they read (e.g. moving a mobject)
+        self.setupPhases = set()
+        # attribute -> phases that wrote (or may have changed) its current value
+        self.writers = dict()
+        # phase -> phases it read the attributes of
+        self.dependencies = dict()
+        pass
+
+    def read(self, name: str):
+        writers = self.writers.get(name)
+        if writers is None or self.phase is None:
+            return
+        self.dependencies.setdefault(self.phase, set()).update(writer for writer in writers if writer != self.phase)
+        if self.phase in self.setupPhases and self.phase not in writers:
+            writers.append(self.phase)
+            pass
+        pass
+
+    def write(self, name: str):
+        if self.phase is None:
+            # Written by something that isn't traced, so none of the phases are needed for it anymore
+            self.writers.pop(name, None)
+            pass
+        else:
+            self.writers[name] = [self.phase]
+            pass
+        pass
+
+    @contextlib.contextmanager
+    def tracing(self, phase: str, setup: bool = False):
+        """Attribute the attributes read and written in the context to phase."""
+        previous_phase = self.phase
+        self.phase = phase
+        if setup:
+            self.setupPhases.add(phase)
+            pass
+        try:
+            yield self
+        finally:
+            self.phase = previous_phase
+            pass
+        pass
+
+    def required(self, phase: str) -> typing.Set[str]:
+        """The phases phase depends on, directly or through other phases."""
+        required = set()
+        pending = [phase]
+        while pending:
+            for dependency in self.dependencies.get(pending.pop(), ()):
+                if dependency not in required:
+                    required.add(dependency)
+                    pending.append(dependency)
+                    pass
+                pass
+            pass
+        return required
+
+    pass
+
+
+@contextlib.contextmanager
+def traceAttributes(cls: type, trace: AttributeTrace):
+    """Trace the attributes of instances of cls that are read and written in the context."""
+    # The hooks are only on the class while tracing, so attribute access isn't slowed down otherwise
+    saved = {name: cls.__dict__[name] for name in ("__getattribute__", "__setattr__", "__delattr__")
+             if name in cls.__dict__}
+    getattribute = cls.__getattribute__
+    setattribute = cls.__setattr__
+    delattribute = cls.__delattr__
+
+    def tracedGetattribute(self, name):
+        trace.read(name)
+        return getattribute(self, name)
+
+    def tracedSetattr(self, name, value):
+        trace.write(name)
+        setattribute(self, name, value)
+        pass
+
+    def tracedDelattr(self, name):
+        trace.write(name)
+        delattribute(self, name)
+        pass
+
+    cls.__getattribute__ = tracedGetattribute
+    cls.__setattr__ = tracedSetattr
+    cls.__delattr__ = tracedDelattr
+    try:
+        yield trace
+    finally:
+        for name in ("__getattribute__", "__setattr__", "__delattr__"):
+            if name in saved:
+                setattr(cls, name, saved[name])
+                pass
+            else:
+                delattr(cls, name)
+                pass
+            pass
+        pass
+    pass
+
+
+def loadDependencies(filename: str, fingerprint: str, selection: typing.Optional[list]
+                     ) -> typing.Optional[typing.Set[str]]:
+    """
+    Return the setups a Topic needs, from the dependencies saved in filename, or None when they have to be traced
+    (i.e. they weren't saved, the code changed, or they were traced for a build of other selected slides).
+    """
+    try:
+        with open(filename) as file:
+            dependencies = json.load(file)
+            pass
+        pass
+    except (OSError, ValueError):
+        return None
+    if dependencies.get("fingerprint") != fingerprint:
+        return None
+    # Dependencies traced while building every slide are needed by any selection of them
+    if dependencies.get("select_slides") is not None and dependencies.get("select_slides") != selection:
+        return None
+    return set(dependencies.get("required", []))
+
+
+def saveDependencies(filename: str, fingerprint: str, selection: typing.Optional[list], trace: AttributeTrace,
+                     phase: str):
+    """Save the setups that phase (i.e. the Topic) needs, as traced, to filename."""
+    dependencies = dict(fingerprint=fingerprint, select_slides=selection,
+                        dependencies={name: sorted(phases) for name, phases in trace.dependencies.items()},
+                        required=sorted(trace.required(phase)))
+    with open(filename + ".partial", "w") as file:
+        json.dump(dependencies, file, indent=1)
+        pass
+    os.replace(filename + ".partial", filename)
+    pass
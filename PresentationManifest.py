@@ -0,0 +1,242 @@
+__all__ = [
+    "BuildManifest",
+]
+
+# Manifest of the builds of a presentation, kept in a SQLite database next to its temporary files.
+#   Every build records what PPTXScene learned about each slide (animations, partial and combined movie files,
+#   thumbnail, duration, notes, the code it's made with and the state it starts from, ...), along with how long each
+#   stage took and how large the files it wrote are, so slides can be looked up by fingerprint (or reused by the next
+#   build, see PPTXScene's reuse_slides) and the build history queried without rendering anything:
+#       python -m presentations.PresentationManifest temp/T01_Examples.manifest.sqlite
+
+if __name__ == '__main__':
+    __package__ = "presentations"
+    pass
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import typing
+
+schema = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    presentation TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    status TEXT NOT NULL,
+    settings TEXT,
+    pptx_file TEXT,
+    pptx_size INTEGER
+);
+CREATE TABLE IF NOT EXISTS slides (
+    build_id INTEGER NOT NULL REFERENCES builds (id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    name TEXT,
+    fingerprint TEXT,
+    notes_fingerprint TEXT,
+    type TEXT,
+    start_animation INTEGER,
+    end_animation INTEGER,
+    partial_movie_files TEXT,
+    slide_movie_file TEXT,
+    slide_movie_size INTEGER,
+    thumbnail_file TEXT,
+    thumbnail_size INTEGER,
+    frames INTEGER,
+    duration INTEGER,
+    waits TEXT,
+    static INTEGER,
+    autonext INTEGER,
+    shownextnotes INTEGER,
+    notes TEXT,
+    seconds REAL,
+    code TEXT,
+    state TEXT,
+    PRIMARY KEY (build_id, number)
+);
+CREATE INDEX IF NOT EXISTS slides_fingerprint ON slides (fingerprint);
+CREATE TABLE IF NOT EXISTS stage_timings (
+    build_id INTEGER NOT NULL REFERENCES builds (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (build_id, stage)
+);
+"""
+
+# slide record key -> column, for the values that are stored as they are
+slide_columns = {
+    "number": "number",
+    "name": "name",
+    "fingerprint": "fingerprint",
+    "notes_fingerprint": "notes_fingerprint",
+    "type": "type",
+    "start": "start_animation",
+    "end": "end_animation",
+    "slide_movie_file": "slide_movie_file",
+    "thumbnail_file": "thumbnail_file",
+    "frames": "frames",
+    "duration": "duration",
+    "static": "static",
+    "autonext": "autonext",
+    "shownextnotes": "shownextnotes",
+    "notes": "notes",
+    "seconds": "seconds",
+    "code": "code",
+    "state": "state",
+}
+# slide record key -> column, for the values that are stored as json
+slide_json_columns = {
+    "partial_movie_files": "partial_movie_files",
+    "waits": "waits",
+}
+# Columns added to the slides table since the first manifests were written, and their types
+added_slide_columns = {
+    "seconds": "REAL",
+    "code": "TEXT",
+    "state": "TEXT",
+}
+
+
+class BuildManifest:
+    """SQLite manifest of the builds of a presentation (see the notes at the top of PresentationManifest)."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        with self.connection:
+            self.connection.executescript(schema)
+            columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(slides)")}
+            for column, column_type in added_slide_columns.items():
+                if column not in columns:
+                    # Manifests written before the column was added
+                    self.connection.execute(f"ALTER TABLE slides ADD COLUMN {column} {column_type}")
+                    pass
+                pass
+            pass
+        pass
+
+    def __enter__(self) -> "BuildManifest":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        pass
+
+    def close(self):
+        self.connection.close()
+        pass
+
+    def startBuild(self, presentation: str, settings: dict = None) -> int:
+        """Record the start of a build, and return its id."""
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO builds (presentation, started, status, settings) VALUES (?, ?, 'running', ?)",
+                (presentation, time.time(), json.dumps(settings or {}, default=str)))
+            pass
+        return cursor.lastrowid
+
+    def finishBuild(self, build_id: int, status: str, slides: typing.List[dict] = (), timings: dict = None,
+                    pptx_file: str = None):
+        """Record the slides, stage timings, and PowerPoint of a build, and how it ended."""
+        rows = list()
+        for slide in slides:
+            row = {column: slide.get(key) for key, column in slide_columns.items()}
+            row.update({column: json.dumps(slide.get(key), default=str) for key, column in slide_json_columns.items()})
+            row["slide_movie_size"] = fileSize(slide.get("slide_movie_file"))
+            row["thumbnail_size"] = fileSize(slide.get("thumbnail_file"))
+            rows.append(row)
+            pass
+        with self.connection:
+            self.connection.execute("UPDATE builds SET finished = ?, status = ?, pptx_file = ?, pptx_size = ? "
+                                    "WHERE id = ?", (time.time(), status, pptx_file, fileSize(pptx_file), build_id))
+            for row in rows:
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO slides (build_id, {', '.join(row)}) "
+                    f"VALUES (?, {', '.join('?' * len(row))})", (build_id, *row.values()))
+                pass
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO stage_timings (build_id, stage, seconds) VALUES (?, ?, ?)",
+                [(build_id, stage, seconds) for stage, seconds in (timings or {}).items()])
+            pass
+        pass
+
+    def findSlide(self, fingerprint: str) -> typing.Optional[dict]:
+        """Return the most recent record of a slide with the fingerprint (see PPTXScene.__slideFingerprint__)."""
+        row = self.connection.execute(
+            "SELECT slides.* FROM slides JOIN builds ON builds.id = slides.build_id "
+            "WHERE fingerprint = ? AND builds.status = 'finished' ORDER BY build_id DESC LIMIT 1",
+            (fingerprint,)).fetchone()
+        return None if row is None else slideRecord(row)
+
+    def builds(self, presentation: str = None) -> typing.List[dict]:
+        """Return the builds (of a presentation), oldest first, with their stage timings."""
+        query = "SELECT * FROM builds" + ("" if presentation is None else " WHERE presentation = ?") + " ORDER BY id"
+        builds = [dict(row) for row in self.connection.execute(query, () if presentation is None else
+                                                              (presentation,))]
+        for build in builds:
+            build["settings"] = json.loads(build["settings"] or "{}")
+            build["timings"] = {row["stage"]: row["seconds"] for row in self.connection.execute(
+                "SELECT stage, seconds FROM stage_timings WHERE build_id = ?", (build["id"],))}
+            pass
+        return builds
+
+    def lastBuild(self, presentation: str = None, status: str = "finished") -> typing.Optional[dict]:
+        builds = [build for build in self.builds(presentation) if status is None or build["status"] == status]
+        return builds[-1] if builds else None
+
+    def buildSlides(self, build_id: int) -> typing.List[dict]:
+        """Return the slide records of a build, in order."""
+        return [slideRecord(row) for row in self.connection.execute(
+            "SELECT * FROM slides WHERE build_id = ? ORDER BY number", (build_id,))]
+
+    pass
+
+
+def slideRecord(row: sqlite3.Row) -> dict:
+    """Convert a row of the slides table back to a slide record like the ones in PPTXScene.slides."""
+    row = dict(row)
+    record = {key: row[column] for key, column in slide_columns.items()}
+    record.update({key: json.loads(row[column]) if row[column] is not None else None
+                   for key, column in slide_json_columns.items()})
+    for key in ("static", "autonext", "shownextnotes"):
+        record[key] = None if record[key] is None else bool(record[key])
+        pass
+    record["slide_movie_size"] = row["slide_movie_size"]
+    record["thumbnail_size"] = row["thumbnail_size"]
+    return record
+
+
+def fileSize(filename: typing.Optional[str]) -> typing.Optional[int]:
+    return os.path.getsize(filename) if filename and os.path.isfile(filename) else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PresentationManifest",
+                                     description="Show the build history of a presentation.")
+    parser.add_argument("manifest", help="manifest database (<temporary_dir>/<presentation>.manifest.sqlite)")
+    parser.add_argument("--slides", action="store_true", help="also list the slides of the last finished build")
+    arguments = parser.parse_args()
+    with BuildManifest(arguments.manifest) as manifest:
+        for build in manifest.builds():
+            duration = "" if build["finished"] is None else f" in {build['finished'] - build['started']:.1f}s"
+            timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in build["timings"].items())
+            print(f"#{build['id']} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(build['started']))} "
+                  f"{build['presentation']}: {build['status']}{duration}"
+                  f"{f' ({timings})' if timings else ''}", file=sys.stdout)
+            pass
+        last_build = manifest.lastBuild()
+        if arguments.slides and last_build is not None:
+            for slide in manifest.buildSlides(last_build["id"]):
+                seconds = "" if slide['seconds'] is None else f" built in {slide['seconds']:.1f}s"
+                print(f"  {slide['number']:>3} {slide['name']} [{slide['start']}, {slide['end']}] "
+                      f"{slide['duration']}ms{seconds} {slide['fingerprint']}", file=sys.stdout)
+                pass
+            pass
+        pass
+    pass
@@ -0,0 +1,245 @@
+__all__ = [
+    "processNotes",
+    "composeNotes",
+    "notesFingerprint",
+    "readTopicNotes",
+    "updateNotes",
+]
+
+# Speaker notes of presentations, and a command to update the notes of a PowerPoint without rendering anything.
+#   None of this imports manim (the Topics are read from their source instead of imported), so it's fast enough to
+#   run after fixing a typo:
+#       python -m presentations.PresentationNotes intro_presentation.py T01_Examples
+
+if __name__ == '__main__':
+    __package__ = "presentations"
+    pass
+
+import re
+import os
+import ast
+import sys
+import time
+import hashlib
+import argparse
+import warnings
+import typing
+from .PPTXPackage import DeckEditor
+
+# This is regex for determining when to condense two or more spaces into one
+# (i.e. whenever the spaces are not preceded by a punctuation)
+not_preceded_pattern = re.compile(r'(?<![.!?]) {2,}', re.M)
+line_start_pattern = re.compile(r'^ ', re.M)
+
+# Parameters of PPTXScene.endSlide, in order, for endSlide calls with positional arguments
+end_slide_parameters = ("loop", "autonext", "notes", "shownextnotes")
+
+
+def processNotes(notes: str) -> str:
+    """
+    Automatically trim indent spaces in notes.
+
+    Because of this, we can use triple quotes to generate notes without un-indenting every line.
+    """
+    # Strip any leading and trailing whitespace from notes string
+    notes = notes.strip()
+    # Replace all occurrences of two or more spaces with a single space
+    #   EXCEPT when preceded by a punctuation mark
+    notes = not_preceded_pattern.sub(' ', notes)
+    # Remove leading white space from new lines.
+    #   (Here we match with just a single space because we reduced all
+    #   multiple space substrings to single spaces in the previous step)
+    notes = line_start_pattern.sub('', notes)
+    # This is equivalent to:
+    #   return line_start_pattern.sub('', not_preceded_pattern.sub(' ', notes.strip()))
+    return notes
+
+
+def composeNotes(slides: typing.List[dict]) -> typing.List[str]:
+    """Return the speaker notes of each slide, with the next slide's notes quoted when it shows them."""
+    composed_notes = list()
+    for slide_index, slide in enumerate(slides):
+        notes = slide["notes"] if slide["notes"] else ""
+        if slide["shownextnotes"] and len(slides) > slide_index + 1:
+            notes += "\n" + "\n".join(list(map(
+                lambda x: "> " + x, (slides[slide_index + 1]["notes"] or "").split("\n"))))
+            pass
+        composed_notes.append(notes)
+        pass
+    return composed_notes
+
+
+def notesFingerprint(notes: str) -> str:
+    return hashlib.sha256(notes.encode()).hexdigest()[:8]
+
+
+def readTopicNotes(filename: str, topic: str) -> typing.List[dict]:
+    """
+    Read the name, notes, and shownextnotes of each slide of a Topic from the source of its presentation.
+
+    topic "All" reads the slides of every other Topic in the file, like Topic.__construct_all__.  Slides turned off
+    with "on=False" in their setup are left out, and slides whose notes aren't a literal (e.g. f-strings) have their
+    notes set to NotImplemented.
+    """
+    with open(filename, encoding="utf-8") as file:
+        module = ast.parse(file.read(), filename)
+        pass
+    topics = {node.name: node for node in module.body if isinstance(node, ast.ClassDef)}
+    if topic not in topics:
+        raise ValueError(f"Topic {topic!r} isn't defined in {filename}.")
+    if topic == "All":
+        topic_classes = [node for name, node in topics.items() if name != "All" and any(
+            isinstance(base, ast.Name) and base.id == "Topic" for base in node.bases)]
+        pass
+    else:
+        topic_classes = [topics[topic]]
+        pass
+
+    slides = list()
+    for topic_class in topic_classes:
+        # Slides are constructed in the order they are first defined in (see Topic.__get_slides__)
+        topic_slides = dict()
+        setups = dict()
+        parents = dict()
+        for node in topic_class.body:
+            if not isinstance(node, ast.FunctionDef):
+                continue
+            for decorator in node.decorator_list:
+                if isinstance(decorator, ast.Name) and decorator.id == "Slide":
+                    topic_slides[node.name] = node
+                    pass
+                elif isinstance(decorator, ast.Attribute) and isinstance(decorator.value, ast.Name):
+                    if decorator.attr == "child":
+                        topic_slides[node.name] = node
+                        parents[node.name] = decorator.value.id
+                        pass
+                    elif decorator.attr == "setup":
+                        setups[decorator.value.id] = node
+                        pass
+                    pass
+                pass
+            pass
+        for name, node in topic_slides.items():
+            # child slides use the setup of their parent (see Slide.setup_defaults)
+            setup_name = name
+            while setup_name in parents and setup_name not in setups:
+                setup_name = parents[setup_name]
+                pass
+            if name in setups or setup_name in setups:
+                if __setupDefaults__(setups.get(name, setups.get(setup_name))).get("on", True) is False:
+                    continue
+                pass
+            slide = dict(name=f"{topic_class.name}.{name}", notes=None, shownextnotes=False)
+            slide.update(__readEndSlide__(node, slide["name"]))
+            slides.append(slide)
+            pass
+        pass
+    return slides
+
+
+def __setupDefaults__(setup: ast.FunctionDef) -> dict:
+    """Literal default values of the arguments of a setup function."""
+    arguments = setup.args
+    positional = arguments.args[len(arguments.args) - len(arguments.defaults):]
+    defaults = dict()
+    for argument, default in list(zip(positional, arguments.defaults)) + list(zip(arguments.kwonlyargs,
+                                                                                   arguments.kw_defaults)):
+        if default is None:
+            continue
+        try:
+            defaults[argument.arg] = ast.literal_eval(default)
+            pass
+        except ValueError:
+            pass
+        pass
+    return defaults
+
+
+def __readEndSlide__(function: ast.FunctionDef, name: str) -> dict:
+    calls = [node for node in ast.walk(function) if isinstance(node, ast.Call) and
+             isinstance(node.func, ast.Attribute) and node.func.attr == "endSlide" and
+             isinstance(node.func.value, ast.Name) and node.func.value.id == "self"]
+    if len(calls) != 1:
+        warnings.warn(f"Slide {name} has {len(calls)} calls to 'self.endSlide' instead of one, its notes are skipped.")
+        return dict(notes=NotImplemented)
+    arguments = dict(zip(end_slide_parameters, calls[0].args))
+    arguments.update({keyword.arg: keyword.value for keyword in calls[0].keywords})
+    end_slide = dict()
+    for parameter in ("notes", "shownextnotes"):
+        if parameter not in arguments:
+            continue
+        try:
+            end_slide[parameter] = ast.literal_eval(arguments[parameter])
+            pass
+        except ValueError:
+            warnings.warn(f"The {parameter} of slide {name} aren't a literal (e.g. they're a f-string), so they can't "
+                          f"be read without rendering the slide; its notes are skipped.")
+            end_slide["notes"] = NotImplemented
+            pass
+        pass
+    if isinstance(end_slide.get("notes"), str):
+        end_slide["notes"] = processNotes(end_slide["notes"])
+        pass
+    return end_slide
+
+
+def updateNotes(presentation: str, slides: typing.List[dict]) -> typing.Tuple[int, int]:
+    """
+    Replace the notes of the slides of a PowerPoint written by PPTXScene with the notes of slides.
+
+    Slides are matched by their name (see PPTXScene.__slideIdentity__), and only the notes parts that changed are
+    written.  Returns the number of slides whose notes were updated and the number that couldn't be.
+    """
+    slide_notes = {slide["name"]: slide for slide in slides}
+    updated = 0
+    skipped = 0
+    with DeckEditor(presentation) as deck:
+        deck_slides = deck.slides()
+        # The notes are composed in the order of the PowerPoint, which is the order the slides were rendered in
+        records = [slide_notes.get(identity.split("#")[0]) for _, identity in deck_slides]
+        composable = [record is not None and record["notes"] is not NotImplemented for record in records]
+        composed_notes = composeNotes([record if usable else dict(notes="", shownextnotes=False)
+                                       for record, usable in zip(records, composable)])
+        for index, ((slide_part, identity), record) in enumerate(zip(deck_slides, records)):
+            next_usable = index + 1 >= len(records) or composable[index + 1]
+            if not composable[index] or (record["shownextnotes"] and not next_usable):
+                warnings.warn(f"The notes of slide {index + 1} ({identity.split('#')[0] or 'unnamed'}) can't be "
+                              f"updated without rendering it.")
+                skipped += 1
+                continue
+            identity_parts = identity.split("#")
+            if len(identity_parts) == 3 and identity_parts[2] == notesFingerprint(composed_notes[index]):
+                continue
+            deck.setNotes(slide_part, composed_notes[index])
+            if len(identity_parts) == 3:
+                deck.setSlideName(slide_part, "#".join(identity_parts[:2] + [notesFingerprint(composed_notes[index])]))
+                pass
+            updated += 1
+            pass
+        pass
+    return updated, skipped
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PresentationNotes",
+                                     description="Update the speaker notes of a rendered Topic's PowerPoint from its "
+                                                 "source, without rendering anything.")
+    parser.add_argument("presentation", help="python file the Topic is defined in")
+    parser.add_argument("topic", help="name of the Topic (or All)")
+    parser.add_argument("--output-folder", default="./pptx/",
+                        help="folder the PowerPoint was written to (see PPTXScene's output_folder)")
+    parser.add_argument("--pptx", default=None, help="PowerPoint to update (instead of the Topic's in the output "
+                                                     "folder)")
+    arguments = parser.parse_args()
+    start = time.perf_counter()
+    if arguments.pptx is None:
+        # "All" presentations are named after their file (see Topic.__init_subclass__)
+        presentation_name = os.path.splitext(os.path.basename(arguments.presentation))[0] \
+            if arguments.topic == "All" else arguments.topic
+        arguments.pptx = os.path.join(arguments.output_folder, presentation_name + ".pptx")
+        pass
+    updated_count, skipped_count = updateNotes(arguments.pptx, readTopicNotes(arguments.presentation, arguments.topic))
+    print(f"Updated the notes of {updated_count} slide{'' if updated_count == 1 else 's'} in {arguments.pptx}"
+          f"{f' ({skipped_count} skipped)' if skipped_count else ''} in {time.perf_counter() - start:.3f}s",
+          file=sys.stdout)
+    pass
@@ -0,0 +1,316 @@
+__all__ = [
+    "BuildQueue",
+    "runWorker",
+    "processTag",
+]
+
+# Queue of build jobs (the Topics of a presentation, or the slides of a Topic) in a directory that every machine
+#   working on the build can reach, e.g. an NFS mount, so no other service is needed.  The coordinator submits the jobs
+#   and waits for their results: a Topic with build_queue set renders its slides from snapshots like it does with
+#   parallel_slides, and buildTopics (see PresentationBuild's --queue) builds its Topics.  Workers on any machine
+#   (with the presentation at the same path) claim the jobs:
+#       python -m presentations.PresentationQueue /shared/queue -j 4
+#   A job is claimed by linking its (fully written) lock file into place, which only one worker can do.  The worker
+#   keeps touching the lock while it works on the job, and the coordinator puts the jobs whose lock wasn't touched for a
+#   while (the worker's --stale-after, which is kept in the lock) back in the queue, e.g. when the worker's machine went
+#   down.  A worker only touches or removes the lock while it's still its own.  Workers write the combined slide videos
+#   and posters to the content addressed store of the queue (see PPTXScene's cache_dir), which the coordinator's
+#   PowerPoint is then assembled from.
+#       <queue>/jobs/<id>.json      jobs that were submitted
+#       <queue>/locks/<id>.lock     jobs that are claimed (by "<host>:<pid>")
+#       <queue>/results/<id>.json   jobs that are done (their result, or the error they failed with)
+#       <queue>/store/              combined slide videos and posters
+
+if __name__ == '__main__':
+    __package__ = "presentations"
+    pass
+
+import os
+import json
+import time
+import uuid
+import socket
+import argparse
+import threading
+import traceback
+import multiprocessing
+import typing
+from .PresentationLogger import logger, TOPIC_INFO, TOPIC_DEBUG, TOPIC_WARNING
+
+
+def processTag() -> str:
+    """Tag of this process for temporary file names in shared folders (processes on other machines share ids)."""
+    return f"{socket.gethostname()}.{os.getpid()}"
+
+
+class BuildQueue:
+    """Lock-file queue of build jobs in a (shared) directory (see the notes at the top of PresentationQueue)."""
+
+    def __init__(self, directory: str, stale_after: float = 300.0):
+        self.directory = os.path.abspath(directory)
+        # Seconds without a heartbeat from the worker of a job before it's claimed again, for the jobs this claims (each
+        # lock keeps the one of the worker that claimed it)
+        self.stale_after = stale_after
+        for folder in ("jobs", "locks", "results", "store"):
+            os.makedirs(os.path.join(self.directory, folder), exist_ok=True)
+            pass
+        pass
+
+    @property
+    def storeDir(self) -> str:
+        return os.path.join(self.directory, "store", "")
+
+    def __jobFile__(self, folder: str, job_id: str) -> str:
+        return os.path.join(self.directory, folder, job_id + (".lock" if folder == "locks" else ".json"))
+
+    def submit(self, kind: str, **job) -> str:
+        """Add a job (of kind "topics" or "slide", see runJob) to the queue, and return its id."""
+        # Ids sort in the order the jobs were submitted, which is the order they're claimed in
+        job_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        writeJson(self.__jobFile__("jobs", job_id), dict(job, kind=kind, id=job_id))
+        return job_id
+
+    def claim(self, worker: str) -> typing.Optional[dict]:
+        """Claim the first job that isn't claimed or done, and return it (None when there isn't one)."""
+        for name in sorted(os.listdir(os.path.join(self.directory, "jobs"))):
+            job_id, extension = os.path.splitext(name)
+            if extension != ".json" or os.path.isfile(self.__jobFile__("results", job_id)):
+                continue
+            # The lock is written to a temporary name and linked into place, so it's never read half written, and only
+            # one worker can link it (link is atomic on NFS as well)
+            partial_lock = f"{self.__jobFile__('locks', job_id)}.{processTag()}.partial"
+            with open(partial_lock, "w") as file:
+                json.dump(dict(worker=worker, claimed=time.time(), stale_after=self.stale_after), file)
+                pass
+            try:
+                os.link(partial_lock, self.__jobFile__("locks", job_id))
+                pass
+            except FileExistsError:
+                continue
+            finally:
+                removeFile(partial_lock)
+                pass
+            try:
+                return readJson(self.__jobFile__("jobs", job_id))
+            except FileNotFoundError:
+                # Withdrawn by the coordinator in the meantime
+                removeFile(self.__jobFile__("locks", job_id))
+                pass
+            pass
+        return None
+
+    def __readLock__(self, job_id: str) -> typing.Optional[dict]:
+        """The lock of a job (None when it isn't claimed, or can't be read)."""
+        try:
+            return readJson(self.__jobFile__("locks", job_id))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def heartbeat(self, job_id: str, worker: str):
+        """Mark the job as still being worked on by worker (unless it was claimed again by another worker)."""
+        if (self.__readLock__(job_id) or {}).get("worker") == worker:
+            try:
+                os.utime(self.__jobFile__("locks", job_id))
+                pass
+            except FileNotFoundError:
+                pass
+            pass
+        pass
+
+    def finish(self, job_id: str, worker: str, result=None, error: str = None):
+        """Record the result of a job (or the error it failed with), and release the lock of worker on it."""
+        if os.path.isfile(self.__jobFile__("jobs", job_id)):
+            # Nobody waits for the result of a job that was withdrawn
+            writeJson(self.__jobFile__("results", job_id), dict(result=result, error=error, finished=time.time()))
+            pass
+        if (self.__readLock__(job_id) or {}).get("worker") == worker:
+            # The job may have been put back in the queue (and claimed by another worker) while this one was late
+            removeFile(self.__jobFile__("locks", job_id))
+            pass
+        pass
+
+    def requeueStale(self):
+        """Put the jobs whose worker stopped sending heartbeats back in the queue."""
+        for name in os.listdir(os.path.join(self.directory, "locks")):
+            try:
+                idle = time.time() - os.path.getmtime(os.path.join(self.directory, "locks", name))
+                pass
+            except FileNotFoundError:
+                continue
+            if not name.endswith(".lock"):
+                # Left behind by a worker that stopped while claiming a job
+                if idle > self.stale_after:
+                    removeFile(os.path.join(self.directory, "locks", name))
+                    pass
+                continue
+            job_id = os.path.splitext(name)[0]
+            # Locks that can't be read (e.g. left empty by an older worker) go stale after the default stale_after
+            lock = self.__readLock__(job_id) or {}
+            if idle > lock.get("stale_after", self.stale_after) and \
+                    not os.path.isfile(self.__jobFile__("results", job_id)):
+                logger.log(TOPIC_WARNING, f'Job {job_id} wasn\'t worked on for {idle:.0f}s, putting it back in the '
+                                          f'queue.')
+                removeFile(self.__jobFile__("locks", job_id))
+                pass
+            pass
+        pass
+
+    def wait(self, job_ids: typing.Iterable[str], poll: float = 1.0) -> typing.Iterator[typing.Tuple[str, dict]]:
+        """
+        Yield the id and result (with the "error" it failed with, if it did) of each job as it's done, and remove it
+        from the queue.  The jobs that aren't done are withdrawn when this is stopped early.
+        """
+        pending = list(job_ids)
+        try:
+            while pending:
+                for job_id in [job_id for job_id in pending if os.path.isfile(self.__jobFile__("results", job_id))]:
+                    result = readJson(self.__jobFile__("results", job_id))
+                    pending.remove(job_id)
+                    removeFile(self.__jobFile__("jobs", job_id))
+                    removeFile(self.__jobFile__("results", job_id))
+                    yield job_id, result
+                    pass
+                if pending:
+                    self.requeueStale()
+                    time.sleep(poll)
+                    pass
+                pass
+            pass
+        finally:
+            self.withdraw(pending)
+            pass
+        pass
+
+    def withdraw(self, job_ids: typing.Iterable[str]):
+        """Remove jobs from the queue (the workers already working on them still finish them)."""
+        for job_id in job_ids:
+            removeFile(self.__jobFile__("jobs", job_id))
+            pass
+        pass
+
+    pass
+
+
+def runJob(job: dict, queue: BuildQueue):
+    """Do a job from the queue, and return its result."""
+    # Imported here, since they import the Topics (and manim), which import this module
+    from .PresentationBuild import loadPresentation, buildChain
+    from .PresentationTopics import renderParallelSlide
+    # Slide videos and posters are combined in the store of the queue, where the coordinator finds them
+    scene_kwargs = dict(job["scene_kwargs"], cache_dir=queue.storeDir, use_slide_cache=True)
+    if job["kind"] == "topics":
+        return buildChain(job["presentation"], job["topics"], job.get("quality"), scene_kwargs)
+    elif job["kind"] == "slide":
+        topic = getattr(loadPresentation(job["presentation"]), job["topic"])
+        return renderParallelSlide(topic, scene_kwargs, job["number"], job["slide_order"], job["snapshot_dir"],
+                                   job["snapshots"], job.get("config"))
+    raise ValueError(f'Unknown kind of job {job["kind"]!r}.')
+
+
+def describeJob(job: dict) -> str:
+    if job["kind"] == "slide":
+        return f'slide {job["number"]} of {job["topic"]}'
+    return ", ".join(job.get("topics", ())) or job["kind"]
+
+
+def runWorker(directory: str, poll: float = 1.0, idle_timeout: float = None, stale_after: float = 300.0) -> int:
+    """
+    Work on the jobs of the queue in directory until there are none for idle_timeout seconds (or forever, by default),
+    and return how many were done.
+    """
+    queue = BuildQueue(directory, stale_after)
+    worker = processTag().replace(".", ":", 1)
+    logger.log(TOPIC_INFO, f'Worker {worker} is waiting for jobs in {queue.directory}.')
+    done = 0
+    idle_since = time.monotonic()
+    while idle_timeout is None or time.monotonic() - idle_since < idle_timeout:
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll)
+            continue
+        logger.log(TOPIC_INFO, f'Worker {worker} is building {describeJob(job)}.')
+        stop = threading.Event()
+        # The lock is touched well within stale_after, so the coordinator doesn't give the job to another worker
+        heartbeat = threading.Thread(target=keepAlive, args=(queue, job["id"], worker, stop, stale_after / 5),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            result = runJob(job, queue)
+            error = None
+            pass
+        except Exception as e:
+            logger.log(TOPIC_WARNING, f'Building {describeJob(job)} failed: {e!r}')
+            result = None
+            error = traceback.format_exc()
+            pass
+        finally:
+            stop.set()
+            heartbeat.join()
+            pass
+        queue.finish(job["id"], worker, result, error)
+        done += 1
+        idle_since = time.monotonic()
+        pass
+    logger.log(TOPIC_DEBUG, f'Worker {worker} stopped after {done} jobs, the queue was idle.')
+    return done
+
+
+def keepAlive(queue: BuildQueue, job_id: str, worker: str, stop: threading.Event, interval: float):
+    while not stop.wait(interval):
+        queue.heartbeat(job_id, worker)
+        pass
+    pass
+
+
+def writeJson(filename: str, value):
+    # Written to a temporary name first, so the file is never read half written
+    partial_file = f"{filename}.{processTag()}.partial"
+    with open(partial_file, "w") as file:
+        json.dump(value, file, default=str)
+        pass
+    os.replace(partial_file, filename)
+    pass
+
+
+def readJson(filename: str):
+    with open(filename) as file:
+        return json.load(file)
+
+
+def removeFile(filename: str):
+    try:
+        os.remove(filename)
+        pass
+    except FileNotFoundError:
+        pass
+    pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PresentationQueue",
+                                     description="Work on the build jobs in a queue directory shared with the "
+                                                 "coordinator.")
+    parser.add_argument("queue", help="queue directory (the build_queue of the Topic, or --queue of PresentationBuild)")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="worker processes to start on this machine")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between looking for jobs")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="stop after there were no jobs for this many seconds (never, by default)")
+    parser.add_argument("--stale-after", type=float, default=300.0,
+                        help="seconds without a heartbeat before a job this claims is put back in the queue (the "
+                             "coordinator reads it from the lock)")
+    arguments = parser.parse_args()
+    worker_arguments = (arguments.queue, arguments.poll, arguments.idle_timeout, arguments.stale_after)
+    if arguments.workers <= 1:
+        runWorker(*worker_arguments)
+        pass
+    else:
+        processes = [multiprocessing.Process(target=runWorker, args=worker_arguments)
+                     for _ in range(arguments.workers)]
+        for process in processes:
+            process.start()
+            pass
+        for process in processes:
+            process.join()
+            pass
+        pass
+    pass
@@ -0,0 +1,134 @@
+__all__ = [
+    "longestFirst",
+    "estimateMakespan",
+    "scheduleReport",
+    "topicSeconds",
+    "slideSeconds",
+]
+
+# Order of the jobs of a build that are done at the same time (the Topics of buildTopics, or the slides of a Topic
+#   with parallel_slides or a build_queue): the jobs that took the longest in the last build (as recorded in the
+#   manifests, see PresentationManifest) are started first, so a long one (e.g. a 3D slide) isn't left running alone at
+#   the end while the other workers are idle.  Jobs without a recorded time are estimated at the average of the others.
+#   The estimated makespan (how long the jobs take with that many workers) is logged before the jobs start, and can be
+#   printed without building anything:
+#       python -m presentations.PresentationSchedule intro_presentation.py -j 6
+#       python -m presentations.PresentationSchedule intro_presentation.py T03_Tensors -j 8
+
+if __name__ == '__main__':
+    __package__ = "presentations"
+    pass
+
+import os
+import sys
+import heapq
+import argparse
+import typing
+from .PresentationManifest import BuildManifest
+
+
+def estimates(seconds: typing.Dict[str, typing.Optional[float]]) -> typing.Dict[str, float]:
+    """The seconds of each job, with the average of the others for the jobs that weren't timed."""
+    known = [value for value in seconds.values() if value is not None]
+    average = sum(known) / len(known) if known else 0.0
+    return {name: average if value is None else value for name, value in seconds.items()}
+
+
+def longestFirst(seconds: typing.Dict[str, typing.Optional[float]]) -> typing.List[str]:
+    """Names of the jobs, longest first (the jobs with the same estimate stay in their order)."""
+    estimated = estimates(seconds)
+    return sorted(estimated, key=lambda name: -estimated[name])
+
+
+def estimateMakespan(seconds: typing.Dict[str, float], workers: int
+                     ) -> typing.Tuple[float, typing.List[typing.List[str]]]:
+    """
+    Return how long the jobs take when each one (in order) is started by the first worker that's free, and the jobs
+    each worker does.
+    """
+    loads = [(0.0, worker) for worker in range(max(1, workers))]
+    assignments = [list() for _ in loads]
+    for name, job_seconds in seconds.items():
+        load, worker = heapq.heappop(loads)
+        assignments[worker].append(name)
+        heapq.heappush(loads, (load + job_seconds, worker))
+        pass
+    return max(load for load, worker in loads), assignments
+
+
+def scheduleReport(title: str, seconds: typing.Dict[str, typing.Optional[float]], workers: int) -> str:
+    """Report of the estimated makespan of the jobs, scheduled longest first, with what each worker does."""
+    estimated = estimates(seconds)
+    ordered = {name: estimated[name] for name in longestFirst(seconds)}
+    makespan, assignments = estimateMakespan(ordered, workers)
+    total = sum(ordered.values())
+    # No schedule can be shorter than the longest job, or than the jobs spread evenly over the workers
+    bound = max([total / max(1, workers)] + list(ordered.values()))
+    untimed = sum(value is None for value in seconds.values())
+    lines = [f"{title}: {len(ordered)} jobs on {workers} workers, estimated makespan {makespan:.1f}s "
+             f"({total:.1f}s one after another, at least {bound:.1f}s)" +
+             (f", {untimed} of them not timed before (estimated at the average)" if untimed else "")]
+    for worker, names in enumerate(assignments):
+        if names:
+            lines.append(f"  worker {worker + 1}: {sum(ordered[name] for name in names):.1f}s - " +
+                         ", ".join(f"{name} {ordered[name]:.1f}s{'?' if seconds[name] is None else ''}"
+                                   for name in names))
+            pass
+        pass
+    return "\n".join(lines)
+
+
+def lastBuild(temporary_dir: str, presentation_name: str, with_slides: bool = False) -> typing.Optional[dict]:
+    """The last finished build of a presentation recorded in its manifest (with its slides), if there is one."""
+    manifest_file = os.path.join(temporary_dir, presentation_name + ".manifest.sqlite")
+    if not os.path.isfile(manifest_file):
+        return None
+    with BuildManifest(manifest_file) as manifest:
+        build = manifest.lastBuild(presentation_name)
+        if build is not None and with_slides:
+            build["slides"] = manifest.buildSlides(build["id"])
+            pass
+        pass
+    return build
+
+
+def topicSeconds(temporary_dir: str, presentation_name: str) -> typing.Optional[float]:
+    """Wall time of the last finished build of a Topic (None when it wasn't built)."""
+    build = lastBuild(temporary_dir, presentation_name)
+    return None if build is None else build["finished"] - build["started"]
+
+
+def slideSeconds(temporary_dir: str, presentation_name: str) -> typing.Dict[str, float]:
+    """Wall time of each slide (by name) in the last finished build of a Topic."""
+    build = lastBuild(temporary_dir, presentation_name, with_slides=True)
+    if build is None:
+        return dict()
+    return {slide["name"]: slide["seconds"] for slide in build["slides"] if slide["seconds"] is not None}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PresentationSchedule",
+                                     description="Print the estimated makespan of building the Topics of a "
+                                                 "presentation (or the slides of a Topic) at the same time, from the "
+                                                 "times of the last builds.")
+    parser.add_argument("presentation", help="python file the Topics are defined in")
+    parser.add_argument("topic", nargs="?", default=None, help="Topic whose slides are scheduled (see parallel_slides)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="workers the jobs are done by")
+    parser.add_argument("--temporary-dir", default="./temp/", help="temporary_dir the manifests are in")
+    arguments = parser.parse_args()
+    # Imported here, since they import manim, which the scheduling doesn't need
+    from .PresentationBuild import loadPresentation, presentationTopics
+    topics = {topic.__name__: topic for topic in presentationTopics(loadPresentation(arguments.presentation))}
+    if arguments.topic is not None:
+        history = slideSeconds(arguments.temporary_dir, topics[arguments.topic].__presentation_name__)
+        report = scheduleReport(f"Slides of {arguments.topic}",
+                                {slide.constructFunction.__qualname__: history.get(slide.constructFunction.__qualname__)
+                                 for slide in topics[arguments.topic].__get_slides__()}, arguments.workers)
+        pass
+    else:
+        report = scheduleReport(f"Topics of {arguments.presentation}",
+                                {name: topicSeconds(arguments.temporary_dir, topic.__presentation_name__)
+                                 for name, topic in topics.items()}, arguments.workers)
+        pass
+    print(report, file=sys.stdout)
+    pass
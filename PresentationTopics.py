@@ -5,18 +5,31 @@ __all__ = [
 
 # from manim_pptx import PPTXScene
 import itertools
+import contextlib
+import inspect
+import concurrent.futures
+import multiprocessing
+import hashlib
+import pickle
+import json
 import time
 import warnings
 import typing
 import types
 import sys
 import os
+import manim
 
 if __name__ == '__main__':
     __package__ = "presentations"
     pass
 from .PresentationLogger import logger, TOPIC_INFO, TOPIC_DEBUG, TOPIC_WARNING
 from .PPTXScene import PPTXScene
+from .PPTXPackage import mergePresentations
+from .PresentationManifest import BuildManifest
+from .PresentationDependencies import AttributeTrace, traceAttributes, loadDependencies, saveDependencies
+from .PresentationQueue import BuildQueue, processTag
+from .PresentationSchedule import longestFirst, scheduleReport, slideSeconds
 
 # TODO: add documentation to Topic object that automatically prints either instructions for operation, OR points to
 #  the manim instructions for operation, e.g. manim -qm -p Presentation.py T01_...
@@ -40,9 +53,6 @@ from .PPTXScene import PPTXScene
 #  make the individual presentations, then combine them all together with sections
 #  MAYBE using "All" shouldn't be how this is done
 
-# TODO (2023-03-13 @ 16:29:59): Make other Topics within the same script "inherit" the previous Topic's "end state"
-#  (maybe check out "play_internal" for ideas how to do this)
-
 # TODO (2023-06-15 @ 19:23:30): Look into using "play_internal" to prep skipped slides (and earlier topics)
 #  https://docs.manim.community/en/stable/reference/manim.scene.scene.Scene.html?highlight=remove#manim.scene.scene.Scene.play_internal
 
@@ -78,6 +88,8 @@ class Topic(PPTXScene):
     Each slide must have a unique name, and names should be relevant to the content covered.
     Components for use in the slides should be defined in a 'setup' function OR on a per-slide basis using the
         @<slide name>.setup decorator
+    Slide setups that take a long time (e.g. building 3D surfaces or Tex) can be cached between runs by adding
+        "cache_setup=True" to their arguments, as long as what they set on self can be pickled
 
     This is also extensible to other formats of slide show creation using Manim if/when we want to switch over to
     something that doesn't use power point since it can cause a lot of issues.
@@ -86,39 +98,84 @@ class Topic(PPTXScene):
     through smooth and in full definition."""
 
     _wait_override_ = None
+    # Start from the end state of the Topic before this one (its mobjects on screen, the attributes it set, and the
+    # camera orientation), saved when it was built, instead of running the setups of every earlier Topic
+    _inherit_end_state_ = False
+
+    def __init__(self, *args, **kwargs):
+        # The Topics of "All" are built with the same arguments (see __render_all__)
+        self.sceneKwargs = dict(kwargs)
+        # Skip the setups of earlier Topics whose attributes this Topic doesn't read, as traced by a previous build
+        # (see PresentationDependencies), instead of only the ones marked with "skip_dependence=True"
+        self.infer_dependencies = kwargs.pop("infer_dependencies", True)
+        # Render the slides in this many processes (0 to render them in turn): the slides are fast-forwarded through
+        # first, saving a snapshot of the scene where each of them starts, then each slide is rendered in a process
+        # that starts from the snapshot of the slide before it (see renderParallelSlide)
+        self.parallel_slides = kwargs.pop("parallel_slides", 0)
+        # Render the slides through a queue in this directory instead, which workers on other machines (that can reach
+        # it, e.g. on an NFS mount) claim them from (see PresentationQueue)
+        self.build_queue = kwargs.pop("build_queue", None)
+        super(Topic, self).__init__(*args, **kwargs)
+        # Trace of the attributes read and written while the dependencies are traced
+        self.attributeTrace = None
+        # Setups of earlier Topics this Topic needs (None when they are all run)
+        self.requiredSetups = None
+        # Folder the snapshots of the slides are saved to (see parallel_slides), the numbers of the slides whose
+        # snapshot was saved, and the number of the slide a process is rendering from them (None for the others)
+        self.snapshotDir = None
+        self.snapshots = set()
+        self.parallelSlide = None
+        # Attributes of the scene itself, which aren't part of a Topic's end state
+        self.sceneAttributes = set(vars(self)) | {'sceneAttributes'}
+        pass
 
     @typing.final
     def construct(self):
-        self.__setup_dependencies__()
-        logger.log(TOPIC_INFO, f'Constructing {self.__class__.__name__}.')
-        slides = list(self.__get_slides__())
-        self.slideSetup(slides=slides)
-        self.slideConstruct(slides=slides)
+        if self.parallelSlide is not None:
+            self.__constructParallelSlide__()
+            return
+        inherited = self._inherit_end_state_ and self.__loadEndState__()
+        with contextlib.nullcontext() if inherited else self.__traceDependencies__():
+            if not inherited:
+                self.__setup_dependencies__()
+                pass
+            logger.log(TOPIC_INFO, f'Constructing {self.__class__.__name__}.')
+            slides = self.__selectSlides__(list(self.__get_slides__()))
+            with self.__tracing__(self.__class__.__name__):
+                self.slideSetup(slides=slides)
+                # Slides that are turned off (by their setup) aren't constructed
+                self.slideOrder = [slide.lineage for slide in slides if slide.__on__]
+                self.__startSnapshots__()
+                self.slideConstruct(slides=slides)
+                pass
+            pass
+        self.__saveEndState__()
+        self.__renderDeferredSlides__()
         pass
 
     @typing.final
     def __construct_all__(self):
+        warnings.warn("The '__construct_all__' method is deprecated, "
+                      "\"All\" merges the PowerPoints of the Topics instead (see '__render_all__')",
+                      DeprecationWarning, 2)
         logger.log(TOPIC_INFO, f'Called "__construct_all__" from {self}')
 
-        # TODO (2023-02-21 @ 12:29:36): Add documentation for this and with naming a subclass "All"
-        if len(self.__class__.__bases__) != 1:
-            non_unique_base = SyntaxError(
-                f'"__construct_all__" method was called by class without a unique base.\n'
-                f'\t\tclass: {self.__class__}\n'
-                f'\t\tbases: {self.__class__.__bases__}'
-            )
-            raise non_unique_base
-        parent_class = self.__class__.__bases__[0]
-        assert issubclass(parent_class, Topic), f'Classes subclassing Topic with name "All" must subclass Topic.'
-
-        topics = [topic for topic in parent_class.__subclasses__()
-                  if not isinstance(self, topic)]  # exclude own class to avoid causing loop
+        topics = self.__all_topics__()
+        if self.select_slides is not None:
+            # Topics after the last one with selected slides don't need to be created at all
+            selected_topics = [index for index, topic in enumerate(topics)
+                               if any(self.__isSelected__(slide.lineage) for slide in topic.__get_slides__())]
+            topics = topics[:selected_topics[-1] + 1] if selected_topics else topics[:1]
+            pass
         for topic in topics:
             logger.log(TOPIC_INFO, f'Creating {topic.__name__} from {self}')
             # Run global setup from topic
             topic.setup(self)
             # Get slides from topic
             slides = list(topic.__get_slides__())
+            if topic is topics[-1]:
+                slides = self.__selectSlides__(slides)
+                pass
             # Run slide setup from topic
             topic.slideSetup(self, slides=slides)
             # Construct each slide for topic
@@ -126,12 +183,106 @@ class Topic(PPTXScene):
             pass
         pass
 
+    def __all_topics__(self) -> typing.List[typing.Type["Topic"]]:
+        """Topics that "All" is made of."""
+        # TODO (2023-02-21 @ 12:29:36): Add documentation for this and with naming a subclass "All"
+        if len(self.__class__.__bases__) != 1:
+            non_unique_base = SyntaxError(
+                f'"All" was built from a class without a unique base.\n'
+                f'\t\tclass: {self.__class__}\n'
+                f'\t\tbases: {self.__class__.__bases__}'
+            )
+            raise non_unique_base
+        parent_class = self.__class__.__bases__[0]
+        assert issubclass(parent_class, Topic), f'Classes subclassing Topic with name "All" must subclass Topic.'
+
+        return [topic for topic in parent_class.__subclasses__()
+                if not isinstance(self, topic)]  # exclude own class to avoid causing loop
+
+    @typing.final
+    def __render_all__(self, *args, **kwargs):
+        """
+        Build the PowerPoint of each Topic (or reuse it when it's up to date), then merge them into one, with a
+        section for each Topic, so changing a Topic only renders that Topic again.
+        """
+        logger.log(TOPIC_INFO, f'Called "__render_all__" from {self}')
+        topics = self.__all_topics__()
+        presentation_name = self.__presentationName__()
+        presentation_path = os.path.join(self.output_folder, presentation_name + '.pptx')
+        os.makedirs(self.output_folder, exist_ok=True)
+        os.makedirs(self.temporary_dir, exist_ok=True)
+
+        manifest = None
+        if self.use_manifest:
+            manifest = BuildManifest(os.path.join(self.temporary_dir, presentation_name + ".manifest.sqlite"))
+            build_id = manifest.startBuild(presentation_name, self.__buildSettings__())
+            pass
+        try:
+            sections = list()
+            for topic in topics:
+                stage_start = time.perf_counter()
+                sections.append((topic.__name__, self.__topicPresentation__(topic)))
+                self.stageTimings[f'topic_{topic.__name__}'] = time.perf_counter() - stage_start
+                pass
+            stage_start = time.perf_counter()
+            slide_count = mergePresentations(presentation_path, sections)
+            self.stageTimings['merge'] = time.perf_counter() - stage_start
+            pass
+        except BaseException:
+            if manifest is not None:
+                manifest.finishBuild(build_id, "failed", timings=self.stageTimings)
+                manifest.close()
+                pass
+            raise
+        if manifest is not None:
+            manifest.finishBuild(build_id, "finished", timings=self.stageTimings, pptx_file=presentation_path)
+            manifest.close()
+            pass
+        logger.log(TOPIC_INFO, f'PowerPoint written to: {presentation_name}.pptx in {self.output_folder} '
+                               f'({slide_count} slides from {len(sections)} Topics, merged in '
+                               f'{self.stageTimings["merge"]:.3f}s)')
+        pass
+
+    def __topicPresentation__(self, topic: typing.Type["Topic"]) -> str:
+        """
+        Return the PowerPoint of topic, building it unless the last build recorded in its manifest is of the same code
+        (of it and the Topics before it) with the same settings, and it wasn't replaced since.
+        """
+        presentation_name = topic.__presentation_name__ + ("" if self.select_slides is None else "_preview")
+        presentation_path = os.path.join(self.output_folder, presentation_name + '.pptx')
+        manifest_file = os.path.join(self.temporary_dir, presentation_name + ".manifest.sqlite")
+        build = None
+        if os.path.isfile(presentation_path) and os.path.isfile(manifest_file):
+            with BuildManifest(manifest_file) as manifest:
+                build = manifest.lastBuild(presentation_name)
+                pass
+            pass
+        # The settings topic would be built with, as they are recorded in the manifest
+        settings = json.loads(json.dumps(self.__buildSettings__(), default=str))
+        topic_topics = list(itertools.takewhile(topic.__negated_subclasscheck__, Topic.__subclasses__())) + [topic]
+        settings['code'] = topicsFingerprint(topic_topics) + configFingerprint()
+        settings['shared_code'] = sharedCodeFingerprint(topic_topics)
+        if build is not None and os.path.getmtime(presentation_path) >= build['started'] and \
+                all(build['settings'].get(key) == value for key, value in settings.items()
+                    if key not in ("media_workers", "stream_media", "package_workers", "incremental_update",
+                                   "parallel_slides", "reuse_slides")):
+            logger.log(TOPIC_INFO, f'Reusing {presentation_name}.pptx, {topic.__name__} hasn\'t changed since it was '
+                                   f'built.')
+            return presentation_path
+        logger.log(TOPIC_INFO, f'Building {topic.__name__} for {self.__presentationName__()}.')
+        topic(**self.sceneKwargs).render()
+        return presentation_path
+
     def __setup_dependencies__(self):
         # Need to set up previous topics in case of dependence on positions
-        for topic in itertools.takewhile(self.__negated_subclasscheck__, Topic.__subclasses__()):
+        for topic in self.__dependency_topics__():
             logger.log(TOPIC_INFO, f'Running dependency setup for {topic.__name__} from {self}')
             # Run global setup from topic
-            topic.setup(self)
+            if self.__requiresSetup__(f'{topic.__name__}.setup'):
+                with self.__tracing__(f'{topic.__name__}.setup', setup=True):
+                    topic.setup(self)
+                    pass
+                pass
             # Get slides from topic, excluding slides that are marked with "skip_dependence=True"
             #                        (usually because they are too expensive)
             slide_options = {slide: slide.setup_defaults for slide in topic.__get_slides__()}
@@ -139,20 +290,351 @@ class Topic(PPTXScene):
             #           if not options.get('skip_dependence', False)]
             slides = []
             for slide, options in slide_options.items():
-                if not options.get('skip_dependence', False):
-                    slides.append(slide)
-                    pass
-                else:
+                if options.get('skip_dependence', False):
                     logger.log(TOPIC_DEBUG, f'Dependency setup for {slide.name} in {topic.__name__} skipped because '
                                             f'it is marked with "skip_dependence=True", this is to skip generating '
                                             f'unnecessary dependencies for slides with long setup times.')
                     pass
+                elif not self.__requiresSetup__(f'{topic.__name__}.{slide.name}.setup'):
+                    logger.log(TOPIC_DEBUG, f'Dependency setup for {slide.name} in {topic.__name__} skipped because '
+                                            f'nothing it sets up is used by {self.__class__.__name__}.')
+                    pass
+                else:
+                    slides.append(slide)
+                    pass
                 pass
-            # Run slide setup from topic
-            topic.slideSetup(self, slides=slides)
+            # Run slide setup from topic (one at a time, so each of them is traced on its own)
+            for slide in slides:
+                with self.__tracing__(f'{topic.__name__}.{slide.name}.setup', setup=True):
+                    topic.slideSetup(self, slides=[slide])
+                    pass
+                pass
+            pass
+        pass
+
+    def __endStateFile__(self, topic: typing.Type["Topic"]) -> str:
+        return os.path.join(self.temporary_dir, topic.__name__ + ".end_state.pickle")
+
+    def __saveEndState__(self):
+        """Save the end state of this Topic, when the Topic after it inherits it (see _inherit_end_state_)."""
+        if not self.__endStateInherited__():
+            return
+        if self.select_slides is not None:
+            logger.log(TOPIC_DEBUG, f'The end state of {self.__class__.__name__} isn\'t saved, only some of its '
+                                    f'slides were built.')
+            return
+        end_state = self.__sceneState__()
+        end_state['fingerprint'] = topicsFingerprint(self.__dependency_topics__() + [type(self)]) + configFingerprint()
+        try:
+            saveState(self.__endStateFile__(type(self)), end_state)
+            logger.log(TOPIC_INFO, f'Saved the end state of {self.__class__.__name__} for '
+                                   f'{self.__nextTopic__().__name__}.')
+            pass
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+            logger.log(TOPIC_WARNING, f'The end state of {self.__class__.__name__} can\'t be saved, it can\'t be '
+                                      f'pickled ({e!r}).')
+            pass
+        pass
+
+    def __nextTopic__(self) -> typing.Optional[typing.Type["Topic"]]:
+        """The Topic after this one (None for the last one, and for Topics that subclass another Topic)."""
+        topics = Topic.__subclasses__()
+        if type(self) not in topics or topics[-1] is type(self):
+            return None
+        return topics[topics.index(type(self)) + 1]
+
+    def __endStateInherited__(self) -> bool:
+        """Whether the Topic after this one inherits its end state."""
+        next_topic = self.__nextTopic__()
+        return next_topic is not None and next_topic._inherit_end_state_
+
+    def __loadEndState__(self) -> bool:
+        """Start from the end state of the Topic before this one, if it was saved since its code last changed."""
+        topics = self.__dependency_topics__()
+        if not topics:
+            return False
+        end_state_file = self.__endStateFile__(topics[-1])
+        try:
+            with open(end_state_file, "rb") as file:
+                end_state = pickle.load(file)
+                pass
+            pass
+        except FileNotFoundError:
+            end_state = None
+            pass
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            logger.log(TOPIC_WARNING, f'The end state of {topics[-1].__name__} can\'t be read ({e!r}).')
+            end_state = None
+            pass
+        if end_state is None or end_state['fingerprint'] != topicsFingerprint(topics) + configFingerprint():
+            logger.log(TOPIC_INFO, f'{self.__class__.__name__} can\'t inherit the end state of '
+                                   f'{topics[-1].__name__}, it hasn\'t been built since it changed; running the '
+                                   f'dependency setups instead.')
+            return False
+        logger.log(TOPIC_INFO, f'{self.__class__.__name__} is inheriting the end state of {topics[-1].__name__}.')
+        self.__restoreSceneState__(end_state)
+        return True
+
+    def __sceneState__(self) -> dict:
+        """The attributes set by the Topics (up to this one), the mobjects, and the orientation of the camera."""
+        topics = self.__dependency_topics__() + [type(self)]
+        # Only the attributes the Topics set (i.e. that their code uses) are saved, not the scene's own
+        names = set().union(*[codeNames(function.__code__) for function in topicFunctions(topics)])
+        return dict(
+            attributes={name: value for name, value in vars(self).items()
+                        if name in names and name not in self.sceneAttributes},
+            mobjects=list(self.mobjects),
+            foreground_mobjects=list(self.foreground_mobjects),
+            camera=dict(phi=self.camera.get_phi(), theta=self.camera.get_theta(), gamma=self.camera.get_gamma(),
+                        zoom=self.camera.get_zoom(), focal_distance=self.camera.get_focal_distance()),
+        )
+
+    def __restoreSceneState__(self, state: dict):
+        for name, value in state['attributes'].items():
+            setattr(self, name, value)
+            pass
+        self.set_camera_orientation(**state['camera'])
+        self.add(*state['mobjects'])
+        self.add_foreground_mobjects(*state['foreground_mobjects'])
+        pass
+
+    def __startSnapshots__(self):
+        """Defer the slides to be rendered from snapshots, when they're rendered in parallel (see parallel_slides)."""
+        if not (self.parallel_slides or self.build_queue) or not self.slideOrder:
+            return
+        if self.build_queue is not None:
+            # The workers read the snapshots from the queue
+            self.snapshotDir = os.path.join(BuildQueue(self.build_queue).directory, "snapshots",
+                                            self.__presentationName__())
+            pass
+        elif "fork" not in multiprocessing.get_all_start_methods():
+            # The processes have to start with the presentation (and its Topics) already loaded
+            logger.log(TOPIC_WARNING, f'The slides of {self.__class__.__name__} are rendered in turn, processes '
+                                      f'can\'t be forked on this platform.')
+            return
+        else:
+            self.snapshotDir = os.path.join(self.temporary_dir, self.__presentationName__() + ".snapshots")
             pass
+        os.makedirs(self.snapshotDir, exist_ok=True)
+        self.deferSlides = True
+        logger.log(TOPIC_INFO, f'Fast-forwarding through the slides of {self.__class__.__name__} to snapshot them.')
         pass
 
+    def __beginSlide__(self, name: str, fingerprint: str = None, parents: typing.List[str] = ()):
+        if self.deferSlides:
+            self.__saveSnapshot__()
+            pass
+        super(Topic, self).__beginSlide__(name, fingerprint, parents)
+        pass
+
+    def __snapshotFile__(self, number: int) -> str:
+        return os.path.join(self.snapshotDir, f"{number}.pickle")
+
+    def __saveSnapshot__(self):
+        """Save the state the current slide starts from."""
+        state = self.__sceneState__()
+        # Time based updaters carry on from the time the slide starts at
+        state['time'] = self.renderer.time
+        try:
+            saveState(self.__snapshotFile__(self.currentSlide), state)
+            self.snapshots.add(self.currentSlide)
+            pass
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+            logger.log(TOPIC_DEBUG, f'Slide {self.currentSlide} can\'t be snapshotted, it can\'t be pickled ({e!r}); '
+                                    f'the slides after it are rendered from an earlier snapshot.')
+            pass
+        pass
+
+    def __loadSnapshot__(self, number: int) -> bool:
+        try:
+            with open(self.__snapshotFile__(number), "rb") as file:
+                state = pickle.load(file)
+                pass
+            pass
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            logger.log(TOPIC_WARNING, f'The snapshot of slide {number} can\'t be read ({e!r}).')
+            return False
+        # The snapshot includes what the setups added
+        self.clear()
+        self.__restoreSceneState__(state)
+        self.renderer.time = state['time']
+        return True
+
+    def __constructParallelSlide__(self):
+        """
+        Construct the slide parallelSlide (in a process of renderParallelSlide), from the snapshot of the slide before
+        it: that slide is fast-forwarded through, so only the animations after it ends (which start the video of
+        parallelSlide) and those of parallelSlide are rendered.
+        """
+        slides = {slide.constructFunction.__qualname__: slide for slide in self.__get_slides__()}
+        start = max((number for number in self.snapshots if number <= max(self.parallelSlide - 1, 1)), default=None)
+        if start is None or not self.__loadSnapshot__(start):
+            logger.log(TOPIC_INFO, f'Slide {self.parallelSlide} has no snapshot to start from, setting up '
+                                   f'{self.__class__.__name__} from the start.')
+            if not (self._inherit_end_state_ and self.__loadEndState__()):
+                self.__setup_dependencies__()
+                pass
+            self.slideSetup(slides=list(self.__get_slides__()))
+            start = 1
+            pass
+        self.currentSlide = start
+        for lineage in self.slideOrder[start - 1:self.parallelSlide]:
+            slides[lineage[0]].constructProtocol(self)
+            pass
+        pass
+
+    def __renderDeferredSlides__(self):
+        """
+        Render the slides that were deferred from their snapshots, in a pool of processes (see parallel_slides) or by
+        the workers of the build_queue, replacing their records.
+        """
+        if not self.deferSlides:
+            return
+        self.deferSlides = False
+        records = {slide_info['number']: slide_info for slide_info in self.slides if slide_info.get('deferred')}
+        # The slides that took the longest to build last time are started first (see PresentationSchedule), the
+        # workers of a build_queue are estimated to be parallel_slides (or one per core)
+        history = slideSeconds(self.temporary_dir, self.__presentationName__())
+        labels = {f"{number} {records[number]['name']}": number for number in records}
+        seconds = {label: history.get(records[number]['name']) for label, number in labels.items()}
+        workers = min(self.parallel_slides or os.cpu_count() or 1, len(records))
+        logger.log(TOPIC_INFO, scheduleReport(f"Slides of {self.__class__.__name__}", seconds, workers))
+        numbers = [labels[label] for label in longestFirst(seconds)]
+        failures = dict()
+        if self.build_queue is not None:
+            rendered = self.__queueSlides__(numbers)
+            pass
+        else:
+            rendered = self.__forkSlides__(numbers)
+            pass
+        for number, slide_info, error in rendered:
+            if error is not None:
+                logger.log(TOPIC_WARNING, f'Rendering slide {number} of {self.__class__.__name__} failed: {error!r}')
+                failures[number] = error
+                continue
+            # The animations are numbered as they are in this scene, rather than in the process that rendered it
+            slide_info.update(start=records[number]['start'], end=records[number]['end'])
+            self.slides[self.slides.index(records[number])] = slide_info
+            self.__saveCheckpoint__()
+            pass
+        if failures:
+            raise RuntimeError(f'Rendering slides {sorted(failures)} of {self.__class__.__name__} failed.'
+                               ) from failures[min(failures)]
+        for number in self.snapshots:
+            os.remove(self.__snapshotFile__(number))
+            pass
+        if not os.listdir(self.snapshotDir):
+            os.rmdir(self.snapshotDir)
+            pass
+        pass
+
+    def __forkSlides__(self, numbers: typing.List[int]
+                       ) -> typing.Iterator[typing.Tuple[int, typing.Optional[dict], typing.Optional[Exception]]]:
+        """Render the slides in a pool of forked processes, yielding their records (or errors) as they're done."""
+        workers = min(self.parallel_slides, len(numbers))
+        logger.log(TOPIC_INFO, f'Rendering {len(numbers)} slides of {self.__class__.__name__} in {workers} '
+                               f'processes.')
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context("fork")) as pool:
+            jobs = {pool.submit(renderParallelSlide, type(self), self.sceneKwargs, number, self.slideOrder,
+                                self.snapshotDir, sorted(self.snapshots)): number for number in numbers}
+            for job in concurrent.futures.as_completed(jobs):
+                try:
+                    yield jobs[job], job.result(), None
+                    pass
+                except Exception as e:
+                    yield jobs[job], None, e
+                    pass
+                pass
+            pass
+        pass
+
+    def __queueSlides__(self, numbers: typing.List[int]
+                        ) -> typing.Iterator[typing.Tuple[int, typing.Optional[dict], typing.Optional[Exception]]]:
+        """Submit the slides to the build_queue, yielding their records (or errors) as the workers finish them."""
+        queue = BuildQueue(self.build_queue)
+        # The workers load the presentation from the same path, and render it with the same config
+        presentation = os.path.abspath(inspect.getfile(type(self)))
+        config = {key: manim.config[key] for key in queue_config}
+        jobs = {queue.submit("slide", presentation=presentation, topic=self.__class__.__name__, number=number,
+                             slide_order=self.slideOrder, snapshot_dir=self.snapshotDir,
+                             snapshots=sorted(self.snapshots), scene_kwargs=self.sceneKwargs, config=config): number
+                for number in numbers}
+        logger.log(TOPIC_INFO, f'Queued {len(jobs)} slides of {self.__class__.__name__}, waiting for the workers of '
+                               f'{queue.directory} (python -m presentations.PresentationQueue {queue.directory}).')
+        for job_id, result in queue.wait(jobs):
+            if result['error'] is not None:
+                yield jobs[job_id], None, RuntimeError(result['error'])
+                pass
+            else:
+                yield jobs[job_id], result['result'], None
+                pass
+            pass
+        pass
+
+    def __dependency_topics__(self) -> typing.List[typing.Type["Topic"]]:
+        """Topics before this one, whose setups it may depend on."""
+        return list(itertools.takewhile(self.__negated_subclasscheck__, Topic.__subclasses__()))
+
+    def __requiresSetup__(self, phase: str) -> bool:
+        return self.requiredSetups is None or phase in self.requiredSetups
+
+    def __tracing__(self, phase: str, setup: bool = False):
+        """Attribute the attributes read and written in the context to phase (while the dependencies are traced)."""
+        if self.attributeTrace is None:
+            return contextlib.nullcontext()
+        return self.attributeTrace.tracing(phase, setup)
+
+    @contextlib.contextmanager
+    def __traceDependencies__(self):
+        """
+        Skip the dependency setups this Topic doesn't need, as traced by a previous build, or trace them during the
+        context when they weren't (or the code changed since).
+        """
+        topics = self.__dependency_topics__()
+        if not self.infer_dependencies or not topics:
+            yield
+            return
+        dependencies_file = os.path.join(self.temporary_dir, self.__class__.__name__ + ".dependencies.json")
+        fingerprint = topicsFingerprint(topics + [type(self)])
+        self.requiredSetups = loadDependencies(dependencies_file, fingerprint, self.select_slides)
+        if self.requiredSetups is not None:
+            logger.log(TOPIC_INFO, f'Running {len(self.requiredSetups)} dependency setup(s) for '
+                                   f'{self.__class__.__name__}, as traced by a previous build.')
+            yield
+            return
+        logger.log(TOPIC_INFO, f'Tracing the dependencies of {self.__class__.__name__} on the setups of earlier '
+                               f'Topics.')
+        self.attributeTrace = AttributeTrace()
+        try:
+            with traceAttributes(type(self), self.attributeTrace):
+                yield
+                pass
+            saveDependencies(dependencies_file, fingerprint, self.select_slides, self.attributeTrace,
+                             self.__class__.__name__)
+            pass
+        finally:
+            self.attributeTrace = None
+            pass
+        pass
+
+    def __selectSlides__(self, slides: typing.List["Slide"]) -> typing.List["Slide"]:
+        """
+        Slides up to the last one that's selected (see PPTXScene's select_slides), which are the only ones that need
+        to be set up and constructed: the slides before it are fast-forwarded through, and the ones after it are left
+        out.
+        """
+        if self.select_slides is None:
+            return slides
+        selected = [index for index, slide in enumerate(slides) if self.__isSelected__(slide.lineage)]
+        if not selected:
+            logger.log(TOPIC_WARNING, f'None of the slides of {self.__class__.__name__} match the selection '
+                                      f'{", ".join(self.select_slides)}.')
+            return []
+        logger.log(TOPIC_INFO, f'Building {len(selected)} selected slide(s), fast-forwarding through the '
+                               f'{selected[-1] + 1 - len(selected)} other slide(s) before them.')
+        return slides[:selected[-1] + 1]
+
     def __get_instance_slides__(self):
         warnings.warn("The '__get_instance_slides__' method is deprecated, "
                       "use '__get_slides__' instead", DeprecationWarning, 2)
@@ -174,9 +656,9 @@ class Topic(PPTXScene):
         # print(cls.__dict__)
         super(Topic, cls).__init_subclass__()
 
-        # If subclass is named "All" then it is considered special and it's "construct" method is replaced with the
-        # "__construct_all__" method.  Furthermore, it may not have any Slide decorated methods itself, and its "setup"
-        # method should be identical to the "Topic.setup" method, since these aren't be used by the "__construct_all__"
+        # If subclass is named "All" then it is considered special and it's "render" method is replaced with the
+        # "__render_all__" method.  Furthermore, it may not have any Slide decorated methods itself, and its "setup"
+        # method should be identical to the "Topic.setup" method, since these aren't be used by the "__render_all__"
         # method.
         if cls.__qualname__ == "All":
             if list(cls.__get_slides__()):
@@ -193,7 +675,8 @@ class Topic(PPTXScene):
                     f'\tsubclasses to "Topic" with the class name "All".'
                 )
                 raise setup_in_All
-            cls.construct = cls.__construct_all__
+            # "All" merges the PowerPoints of the other Topics instead of rendering them again
+            cls.render = cls.__render_all__
             # print(os.path.splitext(os.path.split(sys._getframe(1).f_globals['__file__'])[1])[0])
             # cls.__name__ = os.path.splitext(os.path.split(sys._getframe(1).f_globals['__file__'])[1])[0]
 
@@ -208,10 +691,38 @@ class Topic(PPTXScene):
     def slideConstruct(self, **kwargs):
         slides: typing.List[Slide] = kwargs.get('slides', self.__get_slides__())
         for slide in slides:
+            if slide.__on__ and self.__reuseRemainingSlides__():
+                break
             slide.constructProtocol(self)
             pass
         pass
 
+    def __reuseRemainingSlides__(self) -> bool:
+        """
+        Reuse the slides that are left from the last build instead of constructing them (see reuse_slides), when the
+        slide before them was reused and they didn't change since: they start from the same state as they did then.
+        """
+        if not self.slides or not self.slides[-1].get('reused') or self.slideOrder is None or \
+                self.__endStateInherited__():
+            return False
+        remaining = [lineage[0] for lineage in self.slideOrder[self.currentSlide - 1:]]
+        previous = list(self.previousSlides)
+        start = previous.index(self.slides[-1]['name']) + 1 if self.slides[-1]['name'] in previous else len(previous)
+        fingerprints = {slide.constructFunction.__qualname__: slide.fingerprint for slide in self.__get_slides__()}
+        if previous[start:start + len(remaining)] != remaining or \
+                any(self.__reusableSlide__(name, fingerprints[name]) is None for name in remaining):
+            return False
+        for name in remaining:
+            slide_info = dict(self.previousSlides[name], reused=True)
+            slide_info.update(start=self.currentAnimation, end=self.currentAnimation, number=self.currentSlide)
+            self.slides.append(slide_info)
+            self.currentSlide += 1
+            pass
+        self.__saveCheckpoint__()
+        logger.log(TOPIC_INFO, f'Reusing the last {len(remaining)} slides of {self.__class__.__name__} from the last '
+                               f'build, they didn\'t change.')
+        return True
+
     def slideSetup(self, **kwargs):
         slides: typing.List[Slide] = kwargs.get('slides', self.__get_slides__())
         for slide in slides:
@@ -219,6 +730,35 @@ class Topic(PPTXScene):
             pass
         pass
 
+    def __buildSettings__(self) -> dict:
+        settings = super(Topic, self).__buildSettings__()
+        # The code the slides are made with, so "All" can tell whether the PowerPoint of a Topic is up to date
+        settings['code'] = topicsFingerprint(self.__dependency_topics__() + [type(self)]) + configFingerprint()
+        # The code all the slides depend on, so the slides of the last build aren't reused after it changed
+        settings['shared_code'] = sharedCodeFingerprint(self.__dependency_topics__() + [type(self)])
+        settings['parallel_slides'] = self.parallel_slides
+        return settings
+
+    def __checkpointSettings__(self) -> dict:
+        settings = super(Topic, self).__checkpointSettings__()
+        # Slides that didn't change are resumed even when others did, as long as the setups are the same
+        settings.pop('code')
+        settings.pop('shared_code')
+        settings.pop('parallel_slides')
+        # Slides depend on the setups of this Topic and those before it (see __setup_dependencies__), so a checkpoint
+        # can't be resumed from after any of them changed
+        settings['setups'] = codeFingerprint(*[function for topic in Topic.__subclasses__() for function in (
+            [topic.setup] + [slide.setupFunction for slide in topic.__get_slides__()])])
+        return settings
+
+    def __reuseSettings__(self) -> dict:
+        settings = super(Topic, self).__reuseSettings__()
+        # A slide whose setup changed isn't reused (its fingerprint includes the setup), but none of them are after the
+        # code they share changed
+        settings.pop('setups')
+        settings['shared_code'] = sharedCodeFingerprint(self.__dependency_topics__() + [type(self)])
+        return settings
+
     @classmethod
     def __negated_subclasscheck__(cls, subclass):
         return not cls.__subclasscheck__(subclass)
@@ -234,6 +774,176 @@ class Topic(PPTXScene):
     pass
 
 
+def codeFingerprint(*functions) -> str:
+    """
+    Fingerprint of the code (and default arguments) of functions, which is stable between runs.
+
+    Line numbers aren't included, so moving a function (e.g. by editing the one above it) doesn't change it.
+    """
+    fingerprint = hashlib.sha256()
+    for function in functions:
+        if function is None:
+            fingerprint.update(b"None")
+            continue
+        __hashCode__(fingerprint, function.__code__)
+        fingerprint.update(repr((getattr(function, "__defaults__", None),
+                                 getattr(function, "__kwdefaults__", None))).encode())
+        pass
+    return fingerprint.hexdigest()[:16]
+
+
+def __hashCode__(fingerprint, code: types.CodeType):
+    fingerprint.update(code.co_code)
+    fingerprint.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode())
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            __hashCode__(fingerprint, constant)
+            pass
+        else:
+            fingerprint.update(repr(constant).encode())
+            pass
+        pass
+    pass
+
+
+# The manim config the slides are rendered with by the workers of a build_queue
+queue_config = ("pixel_width", "pixel_height", "frame_rate", "frame_width", "frame_height", "transparent")
+
+
+def topicsFingerprint(topics: typing.List[typing.Type[Topic]]) -> str:
+    """Fingerprint of the code of the methods and slides (and their setups) of topics."""
+    return codeFingerprint(*topicFunctions(topics))
+
+
+def topicFunctions(topics: typing.List[typing.Type[Topic]]) -> typing.List[types.FunctionType]:
+    """Methods and slides (and their setups) of topics."""
+    functions = list()
+    for topic in topics:
+        for value in vars(topic).values():
+            if isinstance(value, Slide):
+                functions.extend(function for function in (value.constructFunction, value.setupFunction)
+                                 if function is not None)
+                pass
+            elif isinstance(value, types.FunctionType):
+                functions.append(value)
+                pass
+            pass
+        pass
+    return functions
+
+
+def sharedCodeFingerprint(topics: typing.List[typing.Type[Topic]]) -> str:
+    """
+    Fingerprint of the code the slides of the last of topics share, i.e. all of it but their own construct and setup
+    functions: the other methods of the Topics, the setups of the slides of the Topics before it, the functions,
+    classes, and constants of the modules they're defined in, and the manim config.
+    """
+    functions = list()
+    constants = list()
+    for topic in topics:
+        for value in vars(topic).values():
+            if isinstance(value, Slide) and topic is not topics[-1] and value.setupFunction is not None:
+                functions.append(value.setupFunction)
+                pass
+            elif isinstance(value, types.FunctionType):
+                functions.append(value)
+                pass
+            pass
+        pass
+    for module in dict.fromkeys(sys.modules[topic.__module__] for topic in topics if topic.__module__ in sys.modules):
+        for name, value in vars(module).items():
+            if isinstance(value, types.FunctionType) and value.__module__ == module.__name__:
+                functions.append(value)
+                pass
+            elif isinstance(value, type) and value.__module__ == module.__name__ and not issubclass(value, Topic):
+                functions.extend(function for function in vars(value).values()
+                                 if isinstance(function, types.FunctionType))
+                pass
+            elif not name.startswith("__") and isinstance(value, (str, int, float, bool, tuple, type(None))):
+                constants.append((name, repr(value)))
+                pass
+            pass
+        pass
+    return hashlib.sha256(repr((codeFingerprint(*functions), sorted(constants), configFingerprint())
+                               ).encode()).hexdigest()[:16]
+
+
+def configFingerprint() -> str:
+    """Fingerprint of the manim config that mobjects depend on (e.g. the frame size and the Tex template)."""
+    config = manim.config
+    return hashlib.sha256(repr((
+        manim.__version__, config.pixel_width, config.pixel_height, config.frame_width, config.frame_height,
+        str(config.renderer), getattr(config.tex_template, "body", None),
+    )).encode()).hexdigest()[:16]
+
+
+def setupCacheKey(function: types.FunctionType, *arguments) -> str:
+    """
+    Fingerprint of what the result of a setup depends on: its code and defaults, the values of the constants (e.g.
+    colors) it uses from its module, the arguments it's called with, and the manim config.
+    """
+    names = codeNames(function.__code__)
+    constants = sorted((name, repr(value)) for name, value in function.__globals__.items()
+                       if name in names and isinstance(value, (str, int, float, bool, tuple, type(None))))
+    return hashlib.sha256(repr((codeFingerprint(function), constants, arguments, configFingerprint())
+                               ).encode()).hexdigest()[:16]
+
+
+def saveState(filename: str, state: dict):
+    """Pickle the state of a scene (see Topic.__sceneState__) to filename."""
+    try:
+        # Pickled together, so attributes that are mobjects on screen are still the same mobjects when loaded
+        with open(filename + ".partial", "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            pass
+        os.replace(filename + ".partial", filename)
+        pass
+    except BaseException:
+        if os.path.isfile(filename + ".partial"):
+            os.remove(filename + ".partial")
+            pass
+        raise
+    pass
+
+
+def renderParallelSlide(topic: typing.Type[Topic], scene_kwargs: dict, number: int,
+                        slide_order: typing.List[typing.List[str]], snapshot_dir: str, snapshots: typing.List[int],
+                        config: dict = None) -> dict:
+    """
+    Render slide number of topic from the snapshots (in a process forked by Topic.__renderDeferredSlides__, or a
+    worker of its build_queue) with the manim config, and return its record.
+    """
+    # Each process writes a movie of its own, and doesn't clean the partial movie files other processes may be
+    # combining out of the cache
+    with manim.tempconfig(dict(config or {}, output_file=f"{topic.__name__}_slide_{number}",
+                               max_files_cached=sys.maxsize)):
+        scene = topic(**dict(scene_kwargs, parallel_slides=0, build_queue=None, select_slides=None, media_workers=0))
+        scene.slideOrder = slide_order
+        scene.renderSlides = {number}
+        scene.snapshotDir = snapshot_dir
+        scene.snapshots = set(snapshots)
+        scene.parallelSlide = number
+        # Only the scene is rendered, the PowerPoint is written by the Topic the slide was deferred by
+        manim.Scene.render(scene)
+        pass
+    movie_file = scene.renderer.file_writer.movie_file_path
+    if movie_file and os.path.isfile(movie_file):
+        os.remove(movie_file)
+        pass
+    return next(slide_info for slide_info in scene.slides if not slide_info.get('skipped'))
+
+
+def codeNames(code: types.CodeType) -> typing.Set[str]:
+    """Names (of globals and attributes) used by code, including in the functions defined in it."""
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names.update(codeNames(constant))
+            pass
+        pass
+    return names
+
+
 class Slide:
     # TODO: figure out how to make name repetition warn the user
     #  (like what happens with re-defined functions within a class)
@@ -265,6 +975,23 @@ class Slide:
     def name(self) -> str:
         return self.constructFunction.__name__
 
+    @property
+    def lineage(self) -> typing.List[str]:
+        """Qualified names (i.e. "<Topic>.<slide>") of the slide and of the slides it's a child of."""
+        slide = self
+        names = [slide.constructFunction.__qualname__]
+        while slide.is_child:
+            slide = slide.__parent_slide__
+            names.append(slide.constructFunction.__qualname__)
+            pass
+        return names
+
+    @property
+    def fingerprint(self) -> str:
+        """Fingerprint of the code of the slide and its setup, which changes whenever either of them is edited."""
+        setup_slide = self.__parent_slide__ if self.is_child else self
+        return codeFingerprint(self.constructFunction, setup_slide.setupFunction)
+
     def __setup__(self):
         # consts = self.code.co_consts
         # # FIXME: this needs to be changed because if multiple values of the input are
@@ -449,6 +1176,9 @@ class Slide:
         if self.__on__:
             # TODO (2023-03-13 @ 12:52:32): add "from {self.parent}" to this log message
             logger.log(TOPIC_INFO, f'Constructing slide "{self.name}".')
+            # The qualified name (i.e. "<Topic>.<slide>") identifies the slide when the PowerPoint is updated, and with
+            # the fingerprint of its code, when a failed build is resumed (its parents' names select child slides)
+            owner.__beginSlide__(self.constructFunction.__qualname__, self.fingerprint, self.lineage[1:])
             return self.constructFunction(owner, *args, **kwargs)
         else:
             # log slide being off
@@ -462,6 +1192,9 @@ class Slide:
             logger.log(TOPIC_INFO, f'Setup for child slide "{self.name}" inherits from parent slide.')
             result = None
             pass
+        elif self.setupFunction is not None and self.setup_defaults.get('cache_setup', False):
+            result = self.__cachedSetup__(owner, *args, **kwargs)
+            pass
         elif self.setupFunction is not None:
             logger.log(TOPIC_INFO, f'Executing slide "{self.name}" setup.')
             result = self.setupFunction(owner, self, *args, **kwargs)
@@ -479,7 +1212,9 @@ class Slide:
         # TODO (2023-05-12 @ 14:01:41): This should also check if the setup is being run for dependence OR being run
         #  for the setup of the slide being created, because in the latter case, then dependence doesn't really matter
         #  because all aspects of the setup are required and therefore in this case, this warning shouldn't be raised.
-        if dt > 1 and not self.setup_defaults.get('skip_dependence', False):
+        # Setups that aren't needed are skipped anyway when the dependencies are inferred
+        if dt > 1 and not self.setup_defaults.get('skip_dependence', False) and \
+                not getattr(owner, 'infer_dependencies', False):
             # TODO (2023-06-18 @ 15:17:16): owner.__presentation_name__ is not correct because it will always be
             #  the Topic doing the setup, not the actual owner of the slide.
             logger.log(TOPIC_WARNING, f'The setup for Slide decorated function {self.name} in '
@@ -492,6 +1227,66 @@ class Slide:
 
         return result
 
+    def __cachedSetup__(self, owner, *args, **kwargs):
+        """
+        Execute the setup, or restore the attributes it sets on owner from the cache when it was executed before (for
+        setups with "cache_setup=True").
+
+        Only the attributes that the setup sets are cached (see setupCacheKey for what it's keyed by), so cached setups
+        shouldn't change the attributes set before them, and what they set has to be picklable.
+        """
+        cache_file = os.path.join(owner.cache_dir, "setups",
+                                  f"{self.name}-{setupCacheKey(self.setupFunction, args, kwargs)}.pickle")
+        # Topics built at the same time share the cache, so the temporary name is unique to the process
+        partial_file = f"{cache_file}.{processTag()}.partial"
+        if os.path.isfile(cache_file):
+            try:
+                with open(cache_file, "rb") as file:
+                    attributes, result = pickle.load(file)
+                    pass
+                pass
+            except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+                logger.log(TOPIC_WARNING, f'The cached setup for slide "{self.name}" can\'t be read ({e!r}), '
+                                          f'executing it instead.')
+                pass
+            else:
+                logger.log(TOPIC_INFO, f'Restoring slide "{self.name}" setup from the cache.')
+                trace = getattr(owner, 'attributeTrace', None)
+                if trace is not None:
+                    # The attributes the setup would have read, when the dependencies are traced (see Topic)
+                    for name in codeNames(self.setupFunction.__code__) & set(vars(owner)):
+                        trace.read(name)
+                        pass
+                    pass
+                for name, value in attributes.items():
+                    setattr(owner, name, value)
+                    pass
+                return result
+            pass
+
+        logger.log(TOPIC_INFO, f'Executing slide "{self.name}" setup.')
+        attributes_before = dict(vars(owner))
+        result = self.setupFunction(owner, self, *args, **kwargs)
+        attributes = {name: value for name, value in vars(owner).items()
+                      if name not in attributes_before or attributes_before[name] is not value}
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            # Written to a temporary name first so an interrupted run doesn't leave partial entries in the cache
+            with open(partial_file, "wb") as file:
+                pickle.dump((attributes, result), file, protocol=pickle.HIGHEST_PROTOCOL)
+                pass
+            os.replace(partial_file, cache_file)
+            pass
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+            # e.g. mobjects with updaters or surfaces made from lambda functions
+            logger.log(TOPIC_WARNING, f'The setup for slide "{self.name}" can\'t be cached, what it sets can\'t be '
+                                      f'pickled ({e!r}).')
+            if os.path.isfile(partial_file):
+                os.remove(partial_file)
+                pass
+            pass
+        return result
+
     # def __set_name__(self, owner, name):
     #     print(owner, name)
     #     pass
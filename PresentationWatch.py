@@ -0,0 +1,114 @@
+__all__ = [
+    "watchPresentation",
+]
+
+# Command that rebuilds Topics whenever the python file they are defined in is saved, while it's being written:
+#       python -m presentations.PresentationWatch intro_presentation.py T02_Philosophy -q l
+#   Each build reuses the slides of the last one that didn't change (see PPTXScene's reuse_slides): slides whose code
+#   (or setup) changed are rendered again, and so are the slides after them that start from a different state (e.g.
+#   their child slides), while the others are fast-forwarded through, or not constructed at all after the last slide
+#   that changed.  The PowerPoint is then updated in place (see PPTXScene's incremental_update), so only the slides that
+#   were rendered are written.  Each build runs in a process forked from the command, which already imported manim and
+#   the rest, so it only loads the presentation itself (see PresentationDaemon).
+
+if __name__ == '__main__':
+    __package__ = "presentations"
+    pass
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+import traceback
+import typing
+from .PresentationDaemon import preload
+
+
+def fileStamp(filename: str) -> typing.Optional[typing.Tuple[int, int]]:
+    """When filename was last modified and its size (None while it doesn't exist, e.g. while an editor replaces it)."""
+    try:
+        stat = os.stat(filename)
+        pass
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def buildChanges(filename: str, topics: typing.List[str], quality: str, build_kwargs: dict):
+    """Build topics (all of those defined in filename by default), reusing the slides that didn't change."""
+    from .PresentationBuild import loadPresentation, presentationTopics, buildTopic
+    module = loadPresentation(filename)
+    for topic in topics or [topic.__name__ for topic in presentationTopics(module)]:
+        start = time.perf_counter()
+        scene = buildTopic(filename, topic, quality, **build_kwargs)
+        reused = sum(bool(slide_info.get('reused')) for slide_info in scene.slides)
+        print(f"Updated {scene.__presentationName__()}.pptx in {time.perf_counter() - start:.1f}s "
+              f"({len(scene.slides) - reused} slides rendered, {reused} reused)", file=sys.stdout, flush=True)
+        pass
+    pass
+
+
+def runBuild(filename: str, topics: typing.List[str], quality: str, build_kwargs: dict):
+    try:
+        buildChanges(filename, topics, quality, build_kwargs)
+        pass
+    except Exception:
+        # The command keeps watching, so the error is only reported
+        traceback.print_exc()
+        sys.exit(1)
+    pass
+
+
+def watchPresentation(filename: str, topics: typing.List[str] = (), quality: str = None, poll: float = 0.5,
+                      settle: float = 0.2, **build_kwargs):
+    """
+    Build topics (all of them by default) from filename with the keyword arguments of the Topics in build_kwargs, then
+    again every time filename is saved, until interrupted.  The file has to stay the same for settle seconds before
+    it's built, so it isn't read while it's being written.
+    """
+    preload()
+    build_kwargs = dict(build_kwargs, reuse_slides=True, incremental_update=True)
+    # Forked builds start with everything preload imported, the others import it again
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    built_stamp = None
+    print(f"Watching {filename} for changes (Ctrl+C to stop).", file=sys.stdout, flush=True)
+    while True:
+        stamp = fileStamp(filename)
+        if stamp is None or stamp == built_stamp:
+            time.sleep(poll)
+            continue
+        time.sleep(settle)
+        if fileStamp(filename) != stamp:
+            continue
+        built_stamp = stamp
+        start = time.perf_counter()
+        build = context.Process(target=runBuild, args=(filename, list(topics), quality, build_kwargs))
+        build.start()
+        build.join()
+        print(f"{'Built' if build.exitcode == 0 else 'Failed to build'} {os.path.basename(filename)} in "
+              f"{time.perf_counter() - start:.1f}s, watching for changes.", file=sys.stdout, flush=True)
+        pass
+    pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m presentations.PresentationWatch",
+                                     description="Rebuild Topics whenever the python file they are defined in is "
+                                                 "saved, only rendering the slides that changed.")
+    parser.add_argument("presentation", help="python file the Topics are defined in")
+    parser.add_argument("topics", nargs="*", help="names of the Topics to build, all of them by default")
+    parser.add_argument("-q", "--quality", default=None, help="render quality, as in manim's -q option")
+    parser.add_argument("--output-folder", default="./pptx/", help="folder to write the PowerPoint to")
+    parser.add_argument("--parallel-slides", type=int, default=0,
+                        help="processes rendering the slides that changed at the same time (see Topic's "
+                             "parallel_slides), 0 to render them in turn")
+    parser.add_argument("--poll", type=float, default=0.5, help="seconds between checking the file for changes")
+    arguments = parser.parse_args()
+    try:
+        watchPresentation(arguments.presentation, arguments.topics, arguments.quality, arguments.poll,
+                          output_folder=arguments.output_folder, parallel_slides=arguments.parallel_slides)
+        pass
+    except KeyboardInterrupt:
+        pass
+    pass
@@ -1,6 +1,13 @@
-from .PresentationTopics import *
-
 __all__ = [
     'Topic',
     'Slide',
 ]
+
+
+def __getattr__(name):
+    # Topic and Slide are imported when they're first used, so the tools that don't render anything (e.g. the notes
+    # command in PresentationNotes) don't have to import manim
+    if name in __all__:
+        from . import PresentationTopics
+        return getattr(PresentationTopics, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")